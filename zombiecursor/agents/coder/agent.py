@@ -2,7 +2,12 @@
 Main agent implementation for the ZombieCoder Coder Agent.
 """
 import asyncio
-from typing import Dict, Any, Optional, AsyncGenerator
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from functools import cached_property, lru_cache
+from typing import Dict, Any, List, Optional, AsyncGenerator
 from pathlib import Path
 from core.interfaces import Agent, AgentRequest, AgentResponse, Message, MessageRole
 from core.llm import LocalLLM
@@ -17,6 +22,36 @@ from tools.git_tool import GitTool
 from tools.system_tool import SystemTool
 
 
+# Response cache settings (seconds / max entries)
+_CACHE_TTL = 600
+_CACHE_MAX_ENTRIES = 1024
+
+# Static tool usage instructions (kept ahead of per-request content)
+_TOOL_INSTRUCTIONS = """Tool Usage Instructions:
+- When you need to read files, use the filesystem tool
+- When you need to run Python code, use the python tool
+- When you need to search for code, use the search tool
+- When you need Git operations, use the git tool
+- When you need system information, use the system tool
+
+Always provide the complete solution with explanations. Remember to communicate as Shawon's friend!"""
+
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+
+def _canonicalize(text: str) -> str:
+    """Normalize line endings and whitespace so prompt prefixes stay byte-stable."""
+    lines = text.replace("\r\n", "\n").split("\n")
+    text = "\n".join(line.rstrip() for line in lines)
+    return _BLANK_RUNS.sub("\n\n", text).strip()
+
+
+@lru_cache(maxsize=1)
+def _load_persona_cached(path_str: str) -> str:
+    """Read and canonicalize the persona file once per process."""
+    return _canonicalize(Path(path_str).read_text(encoding="utf-8"))
+
+
 class CoderAgent(Agent):
     """ZombieCoder Coder Agent - A Bengali coding partner for Shawon."""
     
@@ -25,29 +60,96 @@ class CoderAgent(Agent):
         self.persona_path = Path(__file__).parent / "persona.md"
         self.persona = self._load_persona()
         
-        # Initialize tools
-        self.tools = {
-            "filesystem": FilesystemTool(),
-            "python": PythonTool(),
-            "search": SearchTool(),
-            "git": GitTool(),
-            "system": SystemTool()
+        # Tools are instantiated lazily on first use
+        self._tool_factories = {
+            "filesystem": FilesystemTool,
+            "python": PythonTool,
+            "search": SearchTool,
+            "git": GitTool,
+            "system": SystemTool
+        }
+        self._tools: Dict[str, Any] = {}
+        
+        self._tool_names = tuple(self._tool_factories)
+        
+        # Static capabilities, built once
+        self._capabilities = {
+            "name": "ZombieCoder Coder Agent",
+            "description": "A humorous, sharp, energetic Bengali coding partner",
+            "tools": list(self._tool_names),
+            "capabilities": [
+                "Code comprehension",
+                "Error identification and fixing",
+                "New code generation",
+                "Full file generation",
+                "Directory scanning",
+                "File modification suggestions",
+                "Step-by-step explanations",
+                "Conversational interactions",
+                "Python code execution",
+                "Git operations",
+                "System monitoring",
+                "Project search and analysis"
+            ],
+            "languages": [
+                "Python", "JavaScript", "TypeScript", "Java", "C++", "C#",
+                "HTML", "CSS", "SQL", "Shell scripting"
+            ],
+            "frameworks": [
+                "React", "Node.js", "Django", "Flask", "FastAPI", "Spring",
+                "Express.js", "Next.js", "Vue.js", "Angular"
+            ]
         }
         
-        # Tool descriptions for LLM
-        self.tool_descriptions = self._get_tool_descriptions()
+        # Single pattern matching any tool name, used to detect tool mentions
+        self._tools_re = re.compile(
+            "|".join(re.escape(name) for name in self._tool_names),
+            re.IGNORECASE
+        )
+        
+        # Strong references to fire-and-forget tasks (memory writes)
+        self._background_tasks: set = set()
+        
+        # Response cache: key -> (stored_at, response)
+        self._resp_cache: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
         
         log.info("ZombieCoder Coder Agent initialized")
     
     def _load_persona(self) -> str:
         """Load agent persona from file."""
         try:
-            with open(self.persona_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            return _load_persona_cached(str(self.persona_path))
         except Exception as e:
             log.error(f"Failed to load persona: {str(e)}")
             return "You are a helpful coding assistant."
     
+    def _get_tool(self, name: str) -> Any:
+        """Get a tool instance, creating it on first use."""
+        tool = self._tools.get(name)
+        if tool is None:
+            tool = self._tools[name] = self._tool_factories[name]()
+        return tool
+    
+    @property
+    def tools(self) -> Dict[str, Any]:
+        """All tools, instantiating any that have not been used yet."""
+        for name in self._tool_names:
+            self._get_tool(name)
+        return self._tools
+    
+    @cached_property
+    def tool_descriptions(self) -> str:
+        """Tool descriptions for the LLM, built on first use."""
+        return _canonicalize(self._get_tool_descriptions())
+    
+    @cached_property
+    def _static_prefix(self) -> str:
+        """Canonicalized static prefix of every user message."""
+        return (
+            f"Available Tools:\n{self.tool_descriptions}\n\n"
+            f"{_canonicalize(_TOOL_INSTRUCTIONS)}\n\n"
+        )
+    
     def _get_tool_descriptions(self) -> str:
         """Get descriptions of available tools for the LLM."""
         descriptions = []
@@ -58,6 +160,20 @@ class CoderAgent(Agent):
     async def run(self, request: AgentRequest) -> AgentResponse:
         """Run the agent with given request."""
         try:
+            # Serve identical repeats from the response cache
+            cache_key = self._cache_key(request)
+            cached = self._get_cached_response(cache_key)
+            if cached is not None:
+                return AgentResponse(
+                    agent_type=request.agent_type,
+                    content=cached,
+                    metadata={
+                        "tools_used": self._extract_tools_used(cached),
+                        "context_size": len(request.context) if request.context else 0,
+                        "cache": "hit"
+                    }
+                )
+            
             # Build conversation messages
             messages = [
                 Message(role=MessageRole.SYSTEM, content=self.persona),
@@ -66,15 +182,16 @@ class CoderAgent(Agent):
             
             # Get response from LLM
             response = await self.llm.chat(messages)
+            self._set_cached_response(cache_key, response)
             
             # Store in memory
             if settings.enable_memory:
                 await memory_store.store(
-                    f"agent_request_{hash(request.query)}",
+                    self._memory_key(request),
                     {
                         "query": request.query,
                         "response": response,
-                        "timestamp": asyncio.get_event_loop().time()
+                        "timestamp": time.time()
                     }
                 )
             
@@ -95,6 +212,23 @@ class CoderAgent(Agent):
                 error=str(e)
             )
     
+    async def run_batch(self, requests: List[AgentRequest],
+                        max_concurrency: int = 32) -> List[AgentResponse]:
+        """Run several requests concurrently.
+        
+        Requests are dispatched together (bounded by max_concurrency) so a
+        batching-capable LLM backend can serve them side by side. This relies
+        on LocalLLM.chat not holding a process-wide lock. Responses are
+        returned in the same order as the requests.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def _run_one(request: AgentRequest) -> AgentResponse:
+            async with semaphore:
+                return await self.run(request)
+        
+        return await asyncio.gather(*(_run_one(request) for request in requests))
+    
     async def run_stream(self, request: AgentRequest) -> AsyncGenerator[str, None]:
         """Run the agent with streaming response."""
         try:
@@ -104,73 +238,98 @@ class CoderAgent(Agent):
                 Message(role=MessageRole.USER, content=self._build_user_message(request))
             ]
             
-            # Stream response from LLM
+            # Stream response from LLM, keeping the chunks for memory
+            full_response_parts: list[str] = []
             async for chunk in self.llm.chat_stream(messages):
+                full_response_parts.append(chunk)
                 yield chunk
             
-            # Store in memory (collect full response)
+            # Store in memory without delaying the end of the stream
             if settings.enable_memory:
-                full_response = ""
-                async for chunk in self.llm.chat_stream(messages):
-                    full_response += chunk
-                
-                await memory_store.store(
-                    f"agent_request_{hash(request.query)}",
+                task = asyncio.create_task(memory_store.store(
+                    self._memory_key(request),
                     {
                         "query": request.query,
-                        "response": full_response,
-                        "timestamp": asyncio.get_event_loop().time()
+                        "response": "".join(full_response_parts),
+                        "timestamp": time.time()
                     }
-                )
+                ))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
             
         except Exception as e:
             log.error(f"Agent streaming error: {str(e)}")
             yield f"Arrey Shawon, kichu problem hoyeche! Error: {str(e)}"
     
-    def _build_user_message(self, request: AgentRequest) -> str:
-        """Build user message with context and tools."""
-        message_parts = []
-        
-        # Add context if available
-        if request.context:
-            message_parts.append(f"Project Context:\n{request.context[:3000]}")
+    async def drain(self) -> None:
+        """Wait for pending background memory writes."""
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+    
+    def _memory_key(self, request: AgentRequest) -> str:
+        """Build a memory key that is stable across processes."""
+        raw = f"{request.query}\0{request.context or ''}"
+        digest = hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+        return f"agent_request_{digest}"
+    
+    def _cache_key(self, request: AgentRequest) -> str:
+        """Build a stable response-cache key for a request."""
+        raw = f"{self.persona}\0{request.context or ''}\0{request.query}"
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def _get_cached_response(self, key: str) -> Optional[str]:
+        """Get a cached response if it is still fresh."""
+        entry = self._resp_cache.get(key)
+        if entry is None:
+            return None
         
-        # Add tool information
-        message_parts.append(f"\nAvailable Tools:\n{self.tool_descriptions}")
+        stored_at, response = entry
+        if time.monotonic() - stored_at > _CACHE_TTL:
+            del self._resp_cache[key]
+            return None
         
-        # Add the main query
-        message_parts.append(f"\nUser Query:\n{request.query}")
+        self._resp_cache.move_to_end(key)
+        return response
+    
+    def _set_cached_response(self, key: str, response: str) -> None:
+        """Cache a response, evicting expired and least recently used entries."""
+        now = time.monotonic()
+        self._resp_cache[key] = (now, response)
+        self._resp_cache.move_to_end(key)
         
-        # Add instructions for tool usage
-        message_parts.append("""
+        if len(self._resp_cache) > _CACHE_MAX_ENTRIES:
+            # Drop expired entries first, then the least recently used ones
+            expired = [k for k, (ts, _) in self._resp_cache.items() if now - ts > _CACHE_TTL]
+            for k in expired:
+                del self._resp_cache[k]
+            while len(self._resp_cache) > _CACHE_MAX_ENTRIES:
+                self._resp_cache.popitem(last=False)
+    
+    def _build_user_message(self, request: AgentRequest) -> str:
+        """Build user message with tools and context.
         
-Tool Usage Instructions:
-- When you need to read files, use the filesystem tool
-- When you need to run Python code, use the python tool
-- When you need to search for code, use the search tool
-- When you need Git operations, use the git tool
-- When you need system information, use the system tool
-
-Always provide the complete solution with explanations. Remember to communicate as Shawon's friend!
-        """)
+        Static parts come first so the prompt prefix stays byte-identical
+        across requests and can be reused by provider prompt caches.
+        """
+        if request.context:
+            tail = f"Project Context:\n{request.context[:3000]}\n\nUser Query:\n{request.query}"
+        else:
+            tail = f"User Query:\n{request.query}"
         
-        return "\n".join(message_parts)
+        return self._static_prefix + tail
     
     def _extract_tools_used(self, response: str) -> list:
         """Extract tool usage information from response."""
-        # Simple heuristic to detect tool mentions
-        tools_used = []
-        for tool_name in self.tools.keys():
-            if tool_name.lower() in response.lower():
-                tools_used.append(tool_name)
-        return tools_used
+        # Simple heuristic to detect tool mentions, in a single regex pass
+        found = {match.group(0).lower() for match in self._tools_re.finditer(response)}
+        return [tool_name for tool_name in self._tool_names if tool_name in found]
     
     async def execute_tool(self, tool_name: str, operation: str, **kwargs) -> Dict[str, Any]:
         """Execute a specific tool operation."""
-        if tool_name not in self.tools:
+        if tool_name not in self._tool_factories:
             return {"error": f"Unknown tool: {tool_name}"}
         
-        tool = self.tools[tool_name]
+        tool = self._get_tool(tool_name)
         return await tool.execute(operation, **kwargs)
     
     def get_persona(self) -> str:
@@ -179,72 +338,49 @@ Always provide the complete solution with explanations. Remember to communicate
     
     async def get_capabilities(self) -> Dict[str, Any]:
         """Get agent capabilities."""
-        return {
-            "name": "ZombieCoder Coder Agent",
-            "description": "A humorous, sharp, energetic Bengali coding partner",
-            "tools": list(self.tools.keys()),
-            "capabilities": [
-                "Code comprehension",
-                "Error identification and fixing",
-                "New code generation",
-                "Full file generation",
-                "Directory scanning",
-                "File modification suggestions",
-                "Step-by-step explanations",
-                "Conversational interactions",
-                "Python code execution",
-                "Git operations",
-                "System monitoring",
-                "Project search and analysis"
-            ],
-            "languages": [
-                "Python", "JavaScript", "TypeScript", "Java", "C++", "C#",
-                "HTML", "CSS", "SQL", "Shell scripting"
-            ],
-            "frameworks": [
-                "React", "Node.js", "Django", "Flask", "FastAPI", "Spring",
-                "Express.js", "Next.js", "Vue.js", "Angular"
-            ]
-        }
+        return self._capabilities
     
     async def health_check(self) -> Dict[str, Any]:
         """Check agent health."""
+        async def _probe_tool(tool) -> bool:
+            try:
+                # Try a simple operation
+                return hasattr(tool, 'description')
+            except Exception:
+                return False
+        
+        async def _probe_memory() -> bool:
+            if not settings.enable_memory:
+                return True
+            try:
+                await memory_store.store("health_check", {"test": True})
+                await memory_store.retrieve("health_check")
+                return True
+            except Exception:
+                return False
+        
         try:
-            # Check LLM
-            llm_healthy = await self.llm.health_check()
-            
-            # Check tools
-            tools_healthy = {}
-            for name, tool in self.tools.items():
-                try:
-                    # Try a simple operation
-                    if hasattr(tool, 'description'):
-                        tools_healthy[name] = True
-                    else:
-                        tools_healthy[name] = False
-                except Exception:
-                    tools_healthy[name] = False
-            
-            # Check memory
-            memory_healthy = True
-            if settings.enable_memory:
-                try:
-                    await memory_store.store("health_check", {"test": True})
-                    await memory_store.retrieve("health_check")
-                except Exception:
-                    memory_healthy = False
+            # Run the LLM, tool and memory probes concurrently
+            tools = self.tools
+            tool_names = list(tools)
+            llm_healthy, memory_healthy, *tool_results = await asyncio.gather(
+                self.llm.health_check(),
+                _probe_memory(),
+                *(_probe_tool(tools[name]) for name in tool_names)
+            )
+            tools_healthy = dict(zip(tool_names, tool_results))
             
             return {
                 "healthy": llm_healthy and all(tools_healthy.values()) and memory_healthy,
                 "llm": llm_healthy,
                 "tools": tools_healthy,
                 "memory": memory_healthy,
-                "timestamp": asyncio.get_event_loop().time()
+                "timestamp": time.monotonic()
             }
             
         except Exception as e:
             return {
                 "healthy": False,
                 "error": str(e),
-                "timestamp": asyncio.get_event_loop().time()
+                "timestamp": time.monotonic()
             }
\ No newline at end of file
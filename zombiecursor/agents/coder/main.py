@@ -6,19 +6,29 @@ import argparse
 from agents.coder.agent import CoderAgent
 from core.interfaces import AgentRequest, AgentType
 from core.logging_config import log
+from core.memory import memory_store
 
 
 async def main():
     """Main function for running the agent."""
     parser = argparse.ArgumentParser(description="ZombieCoder Coder Agent")
     parser.add_argument("--query", type=str, help="Query to process")
+    parser.add_argument("--queries-file", type=str, help="File with one query per line to process as a batch")
     parser.add_argument("--interactive", action="store_true", help="Run in interactive mode")
     parser.add_argument("--health-check", action="store_true", help="Perform health check")
     
     args = parser.parse_args()
     
     agent = CoderAgent()
-    
+    try:
+        await _run(agent, args)
+    finally:
+        # Let background memory writes finish before the loop shuts down
+        await agent.drain()
+
+
+async def _run(agent: CoderAgent, args: argparse.Namespace) -> None:
+    """Run the mode selected on the command line."""
     if args.health_check:
         health = await agent.health_check()
         print(f"Agent Health: {health}")
@@ -57,6 +67,24 @@ async def main():
             except Exception as e:
                 print(f"\n❌ Error: {str(e)}")
     
+    elif args.queries_file:
+        with open(args.queries_file, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+        
+        requests = [
+            AgentRequest(query=query, agent_type=AgentType.CODER)
+            for query in queries
+        ]
+        
+        responses = await agent.run_batch(requests)
+        for query, response in zip(queries, responses):
+            print(f"👤 Shawon: {query}")
+            print(f"🧟 ZombieCoder: {response.content}")
+            
+            if response.error:
+                print(f"❌ Error: {response.error}")
+            print()
+    
     elif args.query:
         request = AgentRequest(
             query=args.query,
@@ -70,8 +98,12 @@ async def main():
             print(f"❌ Error: {response.error}")
     
     else:
-        print("Please provide a query with --query or use --interactive mode")
+        print("Please provide a query with --query, a batch with --queries-file, or use --interactive mode")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    try:
+        asyncio.run(main())
+    finally:
+        # Commit pending memory writes, the flush timer dies with the loop
+        memory_store.close()
@@ -1,25 +1,63 @@
 """
 Prompt templates and management for the Coder Agent.
 """
-from typing import Dict, Any, List
+import os
+from typing import Dict, Any, List, Tuple
+from functools import lru_cache
 from pathlib import Path
+from string import Formatter
+
+
+_FORMATTER = Formatter()
+
+
+@lru_cache(maxsize=64)
+def _parse_template(template: str) -> Tuple[Tuple[str, Any, Any, Any], ...]:
+    """Parse a template into (literal, field, spec, conversion) tuples once."""
+    return tuple(_FORMATTER.parse(template))
+
+
+def _render(template: str, kwargs: Dict[str, Any], missing: List[str]) -> str:
+    """Render a template, marking fields not in kwargs and recording them in missing."""
+    parts = []
+    for literal, field, spec, conversion in _parse_template(template):
+        parts.append(literal)
+        if field is None:
+            continue
+        
+        if field in kwargs:
+            value = kwargs[field]
+        else:
+            try:
+                value = _FORMATTER.get_field(field, (), kwargs)[0]
+            except (KeyError, IndexError, AttributeError):
+                # Handle missing variables gracefully
+                missing.append(field)
+                parts.append(f"[Missing variable: {field}]")
+                continue
+        
+        if spec and '{' in spec:
+            # Expand nested fields in the spec first, e.g. {x:>{width}}
+            seen = len(missing)
+            spec = _render(spec, kwargs, missing)
+            if len(missing) > seen:
+                parts.append(f"[Missing variable: {missing[seen]}]")
+                continue
+        
+        if conversion:
+            value = _FORMATTER.convert_field(value, conversion)
+        parts.append(format(value, spec))
+    
+    return "".join(parts)
 
 
 class PromptManager:
     """Manages prompt templates for the Coder Agent."""
     
-    def __init__(self):
-        self.prompts_dir = Path(__file__).parent / "prompts"
-        self.prompts_dir.mkdir(exist_ok=True)
-        
-        # Initialize default prompts
-        self._init_default_prompts()
-    
-    def _init_default_prompts(self):
-        """Initialize default prompt templates."""
-        
+    # Default prompt templates, written to disk only when missing
+    _DEFAULT_PROMPTS = {
         # Code generation prompt
-        code_gen_prompt = """
+        "code_generation": """
 You are ZombieCoder Coder Agent, Shawon's friendly Bengali coding partner.
 
 TASK: Generate high-quality, production-ready code based on the request.
@@ -37,12 +75,10 @@ CONTEXT: {context}
 REQUEST: {request}
 
 Please provide the complete solution with explanations.
-        """
-        
-        self.save_prompt("code_generation", code_gen_prompt)
+        """,
         
         # Error fixing prompt
-        error_fix_prompt = """
+        "error_fixing": """
 You are ZombieCoder Coder Agent, Shawon's friendly Bengali coding partner.
 
 TASK: Debug and fix the provided code error.
@@ -59,12 +95,10 @@ ERROR DETAILS: {error_details}
 CODE: {code}
 
 Please help Shawon understand and fix this issue!
-        """
-        
-        self.save_prompt("error_fixing", error_fix_prompt)
+        """,
         
         # Code review prompt
-        code_review_prompt = """
+        "code_review": """
 You are ZombieCoder Coder Agent, Shawon's friendly Bengali coding partner.
 
 TASK: Perform a comprehensive code review.
@@ -82,12 +116,10 @@ CODE TO REVIEW: {code}
 CONTEXT: {context}
 
 Provide constructive feedback and specific recommendations.
-        """
-        
-        self.save_prompt("code_review", code_review_prompt)
+        """,
         
         # Explanation prompt
-        explanation_prompt = """
+        "explanation": """
 You are ZombieCoder Coder Agent, Shawon's friendly Bengali coding partner.
 
 TASK: Explain the provided code or concept in detail.
@@ -105,12 +137,10 @@ CODE/CONCEPT: {code_or_concept}
 SPECIFIC QUESTIONS: {questions}
 
 Make it easy for Shawon to understand!
-        """
-        
-        self.save_prompt("explanation", explanation_prompt)
+        """,
         
         # Refactoring prompt
-        refactoring_prompt = """
+        "refactoring": """
 You are ZombieCoder Coder Agent, Shawon's friendly Bengali coding partner.
 
 TASK: Refactor the provided code to improve quality, maintainability, and performance.
@@ -129,19 +159,43 @@ REFACTORING REQUIREMENTS: {requirements}
 
 Show both the refactored code and explain the improvements made.
         """
+    }
+    
+    def __init__(self):
+        self.prompts_dir = Path(__file__).parent / "prompts"
+        self.prompts_dir.mkdir(exist_ok=True)
+        
+        # Loaded templates: name -> (file mtime, template)
+        self._template_cache: Dict[str, Tuple[int, str]] = {}
         
-        self.save_prompt("refactoring", refactoring_prompt)
+        # Initialize default prompts
+        self._init_default_prompts()
+    
+    def _init_default_prompts(self):
+        """Initialize default prompt templates that do not exist yet."""
+        for prompt_name, content in self._DEFAULT_PROMPTS.items():
+            if not (self.prompts_dir / f"{prompt_name}.txt").exists():
+                self.save_prompt(prompt_name, content)
     
     def get_prompt(self, prompt_name: str) -> str:
         """Get a prompt template by name."""
         prompt_file = self.prompts_dir / f"{prompt_name}.txt"
         
-        if prompt_file.exists():
-            with open(prompt_file, 'r', encoding='utf-8') as f:
-                return f.read()
+        try:
+            mtime = prompt_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            # Return default prompt if file doesn't exist
+            self._template_cache.pop(prompt_name, None)
+            return self._get_default_prompt(prompt_name)
+        
+        # Reuse the cached template while the file is unchanged
+        entry = self._template_cache.get(prompt_name)
+        if entry and entry[0] == mtime:
+            return entry[1]
         
-        # Return default prompt if file doesn't exist
-        return self._get_default_prompt(prompt_name)
+        template = prompt_file.read_text(encoding='utf-8')
+        self._template_cache[prompt_name] = (mtime, template)
+        return template
     
     def _get_default_prompt(self, prompt_name: str) -> str:
         """Get default prompt if custom one doesn't exist."""
@@ -158,18 +212,18 @@ Show both the refactored code and explain the improvements made.
     def save_prompt(self, prompt_name: str, content: str):
         """Save a prompt template."""
         prompt_file = self.prompts_dir / f"{prompt_name}.txt"
-        with open(prompt_file, 'w', encoding='utf-8') as f:
+        tmp_file = self.prompts_dir / f"{prompt_name}.txt.tmp"
+        
+        # Write to a temporary file, then atomically replace the template
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             f.write(content)
+        os.replace(tmp_file, prompt_file)
+        self._template_cache.pop(prompt_name, None)
     
     def format_prompt(self, prompt_name: str, **kwargs) -> str:
         """Format a prompt template with provided variables."""
         template = self.get_prompt(prompt_name)
-        
-        try:
-            return template.format(**kwargs)
-        except KeyError as e:
-            # Handle missing variables gracefully
-            return template + f"\n\n[Missing variable: {str(e)}]"
+        return _render(template, kwargs, [])
     
     def get_system_prompt(self, context: str = "", tools_info: str = "") -> str:
         """Get the main system prompt with context and tools."""
@@ -201,31 +255,36 @@ CODE QUALITY STANDARDS:
 
         """
         
+        prompt_parts = [system_prompt]
+        
         if context:
-            system_prompt += f"\nPROJECT CONTEXT:\n{context}\n"
+            prompt_parts.append(f"\nPROJECT CONTEXT:\n{context}\n")
         
         if tools_info:
-            system_prompt += f"\nAVAILABLE TOOLS:\n{tools_info}\n"
+            prompt_parts.append(f"\nAVAILABLE TOOLS:\n{tools_info}\n")
         
-        system_prompt += """
+        prompt_parts.append("""
 Remember: You are Shawon's trusted coding friend. Help him learn and grow!
-        """
+        """)
         
-        return system_prompt
+        return "".join(prompt_parts)
     
     def list_prompts(self) -> List[str]:
         """List all available prompt templates."""
-        prompts = []
-        for prompt_file in self.prompts_dir.glob("*.txt"):
-            prompts.append(prompt_file.stem)
-        return prompts
+        with os.scandir(self.prompts_dir) as entries:
+            return [
+                entry.name[:-4] for entry in entries
+                if entry.name.endswith(".txt") and entry.is_file()
+            ]
     
     def delete_prompt(self, prompt_name: str) -> bool:
         """Delete a prompt template."""
         prompt_file = self.prompts_dir / f"{prompt_name}.txt"
         
-        if prompt_file.exists():
-            prompt_file.unlink()
-            return True
+        self._template_cache.pop(prompt_name, None)
         
-        return False
\ No newline at end of file
+        try:
+            os.unlink(prompt_file)
+            return True
+        except FileNotFoundError:
+            return False
\ No newline at end of file
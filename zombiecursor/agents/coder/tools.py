@@ -1,6 +1,9 @@
 """
 Tool integration and management for the Coder Agent.
 """
+import asyncio
+import os
+import re
 from typing import Dict, Any, List, Optional
 from tools.fs_tool import FilesystemTool
 from tools.python_tool import PythonTool
@@ -10,17 +13,47 @@ from tools.system_tool import SystemTool
 from core.logging_config import log
 
 
+# Keywords that suggest each tool, matched in one pass over the query
+_RECOMMENDATION_KEYWORDS = {
+    "filesystem": ["file", "read", "write", "create", "delete", "folder"],
+    "python": ["run", "execute", "python", "code", "test"],
+    "search": ["search", "find", "look for", "where", "locate"],
+    "git": ["git", "commit", "push", "pull", "branch", "merge"],
+    "system": ["system", "process", "memory", "disk", "cpu"],
+}
+_RECOMMENDATION_ORDER = tuple(_RECOMMENDATION_KEYWORDS)
+_RECOMMENDER = re.compile(
+    "|".join(
+        f"(?P<{tool}>{'|'.join(re.escape(word) for word in words)})"
+        for tool, words in _RECOMMENDATION_KEYWORDS.items()
+    ),
+    re.IGNORECASE
+)
+
+# Python import statements, without surrounding whitespace
+_IMPORT_RE = re.compile(r"^[ \t]*((?:import|from) [^\r\n]*?)[ \t\r]*$", re.MULTILINE)
+
+# Code review patterns, scanned in a single pass
+_REVIEW_RE = re.compile(
+    r"(?P<secret>(?i:password|secret))"
+    r"|(?P<dyncode>eval\(|exec\()"
+    r"|(?P<rangelen>for\s+\w+\s+in\s+range\(len\()"
+)
+
+
 class ToolManager:
     """Manages tool integration for the Coder Agent."""
     
     def __init__(self):
-        self.tools = {
-            "filesystem": FilesystemTool(),
-            "python": PythonTool(),
-            "search": SearchTool(),
-            "git": GitTool(),
-            "system": SystemTool()
+        # Tools are instantiated lazily on first use
+        self._tool_factories = {
+            "filesystem": FilesystemTool,
+            "python": PythonTool,
+            "search": SearchTool,
+            "git": GitTool,
+            "system": SystemTool
         }
+        self._tools: Dict[str, Any] = {}
         
         # Tool categories for better organization
         self.tool_categories = {
@@ -31,15 +64,29 @@ class ToolManager:
             "system_info": ["system"]
         }
         
-        log.info("Tool Manager initialized with tools: %s", list(self.tools.keys()))
+        log.info("Tool Manager initialized with tools: %s", list(self._tool_factories))
+    
+    def _get_tool(self, name: str) -> Any:
+        """Get a tool instance, creating it on first use."""
+        tool = self._tools.get(name)
+        if tool is None:
+            tool = self._tools[name] = self._tool_factories[name]()
+        return tool
+    
+    @property
+    def tools(self) -> Dict[str, Any]:
+        """All tools, instantiating any that have not been used yet."""
+        for name in self._tool_factories:
+            self._get_tool(name)
+        return self._tools
     
     async def execute_tool(self, tool_name: str, operation: str, **kwargs) -> Dict[str, Any]:
         """Execute a specific tool operation."""
-        if tool_name not in self.tools:
+        if tool_name not in self._tool_factories:
             return {"error": f"Unknown tool: {tool_name}"}
         
         try:
-            tool = self.tools[tool_name]
+            tool = self._get_tool(tool_name)
             result = await tool.execute(operation, **kwargs)
             
             # Log tool usage
@@ -53,10 +100,10 @@ class ToolManager:
     
     def get_tool_info(self, tool_name: str) -> Optional[Dict[str, Any]]:
         """Get information about a specific tool."""
-        if tool_name not in self.tools:
+        if tool_name not in self._tool_factories:
             return None
         
-        tool = self.tools[tool_name]
+        tool = self._get_tool(tool_name)
         return {
             "name": tool_name,
             "description": tool.description(),
@@ -66,7 +113,7 @@ class ToolManager:
     def get_all_tools_info(self) -> Dict[str, Any]:
         """Get information about all available tools."""
         tools_info = {}
-        for name in self.tools:
+        for name in self._tool_factories:
             tools_info[name] = self.get_tool_info(name)
         return tools_info
     
@@ -74,19 +121,29 @@ class ToolManager:
         """Get tools by category."""
         return self.tool_categories.get(category, [])
     
-    async def batch_execute(self, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Execute multiple tool operations in batch."""
-        results = []
+    async def batch_execute(self, operations: List[Dict[str, Any]],
+                            max_concurrency: int = 8) -> List[Dict[str, Any]]:
+        """Execute multiple tool operations in batch, concurrently."""
+        semaphore = asyncio.Semaphore(max_concurrency)
         
-        for op in operations:
-            tool_name = op.get("tool")
-            operation = op.get("operation")
-            params = op.get("params", {})
-            
-            result = await self.execute_tool(tool_name, operation, **params)
+        async def _execute(op: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.execute_tool(
+                    op.get("tool"), op.get("operation"), **op.get("params", {})
+                )
+        
+        outcomes = await asyncio.gather(
+            *(_execute(op) for op in operations),
+            return_exceptions=True
+        )
+        
+        results = []
+        for op, result in zip(operations, outcomes):
+            if isinstance(result, Exception):
+                result = {"error": str(result)}
             results.append({
-                "tool": tool_name,
-                "operation": operation,
+                "tool": op.get("tool"),
+                "operation": op.get("operation"),
                 "result": result
             })
         
@@ -102,51 +159,52 @@ class ToolManager:
             "git_info": None
         }
         
+        # Git blame does not depend on the file content, start it right away
+        git_task = asyncio.create_task(self.execute_tool("git", "blame", file_path=file_path))
+        
         try:
-            # Get basic file info
-            fs_result = await self.execute_tool("filesystem", "file_info", path=file_path)
+            # Get basic file info and read file content for analysis
+            fs_result, read_result = await asyncio.gather(
+                self.execute_tool("filesystem", "file_info", path=file_path),
+                self.execute_tool("filesystem", "read_file", path=file_path)
+            )
             if fs_result.get("success"):
                 analysis["basic_info"] = fs_result.get("info")
             
-            # Read file content for analysis
-            read_result = await self.execute_tool("filesystem", "read_file", path=file_path)
             if read_result.get("success"):
                 content = read_result.get("content", "")
                 
                 # Analyze imports/dependencies
                 if file_path.endswith('.py'):
-                    imports = []
-                    lines = content.split('\n')
-                    for line in lines:
-                        line = line.strip()
-                        if line.startswith('import ') or line.startswith('from '):
-                            imports.append(line)
-                    analysis["dependencies"] = imports
+                    analysis["dependencies"] = _IMPORT_RE.findall(content)
                 
-                # Search for functions and classes
-                search_functions = await self.execute_tool(
-                    "search", "search_functions", 
-                    function_name="", 
-                    directory=file_path[:file_path.rfind('/')],
-                    file_patterns=[file_path.split('/')[-1]]
-                )
-                
-                search_classes = await self.execute_tool(
-                    "search", "search_classes",
-                    class_name="",
-                    directory=file_path[:file_path.rfind('/')],
-                    file_patterns=[file_path.split('/')[-1]]
+                # Search for functions and classes concurrently
+                directory = os.path.dirname(file_path) or "."
+                file_name = os.path.basename(file_path)
+                search_functions, search_classes = await asyncio.gather(
+                    self.execute_tool(
+                        "search", "search_functions",
+                        function_name="",
+                        directory=directory,
+                        file_patterns=[file_name]
+                    ),
+                    self.execute_tool(
+                        "search", "search_classes",
+                        class_name="",
+                        directory=directory,
+                        file_patterns=[file_name]
+                    )
                 )
                 
                 analysis["content_analysis"] = {
                     "functions": search_functions.get("matches", []),
                     "classes": search_classes.get("matches", []),
-                    "line_count": len(content.split('\n')),
+                    "line_count": content.count('\n') + 1,
                     "char_count": len(content)
                 }
             
             # Get git information if available
-            git_result = await self.execute_tool("git", "blame", file_path=file_path)
+            git_result = await git_task
             if git_result.get("success"):
                 analysis["git_info"] = {
                     "blame_info": git_result.get("blame_info", [])[:10]  # Limit to first 10 lines
@@ -158,6 +216,7 @@ class ToolManager:
             }
             
         except Exception as e:
+            git_task.cancel()
             return {
                 "success": False,
                 "error": str(e),
@@ -194,12 +253,19 @@ class ToolManager:
                 except:
                     review["style_issues"] = {"error": "Linting not available"}
             
+            # Scan the content once for all review patterns
+            found = set()
+            for match in _REVIEW_RE.finditer(content):
+                found.add(match.lastgroup)
+                if len(found) == 3:
+                    break
+            
             # Security analysis (basic)
             security_issues = []
-            if "password" in content.lower() or "secret" in content.lower():
+            if "secret" in found:
                 security_issues.append("Potential hardcoded secrets detected")
             
-            if "eval(" in content or "exec(" in content:
+            if "dyncode" in found:
                 security_issues.append("Dynamic code execution detected")
             
             review["security_issues"] = {
@@ -210,7 +276,7 @@ class ToolManager:
             # Performance suggestions (basic)
             performance_suggestions = []
             if file_path.endswith('.py'):
-                if "for i in range(len(" in content:
+                if "rangelen" in found:
                     performance_suggestions.append("Consider using enumerate() instead of range(len())")
                 
                 if content.count("import ") > 10:
@@ -235,27 +301,7 @@ class ToolManager:
     
     def get_tool_recommendations(self, query: str) -> List[str]:
         """Get tool recommendations based on query."""
-        query_lower = query.lower()
-        recommendations = []
-        
-        # File operations
-        if any(word in query_lower for word in ["file", "read", "write", "create", "delete", "folder"]):
-            recommendations.append("filesystem")
-        
-        # Code execution
-        if any(word in query_lower for word in ["run", "execute", "python", "code", "test"]):
-            recommendations.append("python")
-        
-        # Search operations
-        if any(word in query_lower for word in ["search", "find", "look for", "where", "locate"]):
-            recommendations.append("search")
-        
-        # Git operations
-        if any(word in query_lower for word in ["git", "commit", "push", "pull", "branch", "merge"]):
-            recommendations.append("git")
-        
-        # System operations
-        if any(word in query_lower for word in ["system", "process", "memory", "disk", "cpu"]):
-            recommendations.append("system")
+        hits = {match.lastgroup for match in _RECOMMENDER.finditer(query)}
+        recommendations = [name for name in _RECOMMENDATION_ORDER if name in hits]
         
-        return recommendations if recommendations else ["filesystem", "search"]  # Default recommendations
\ No newline at end of file
+        return recommendations if recommendations else ["filesystem", "search"]  # Default recommendations
@@ -0,0 +1,35 @@
+"""
+Shared test setup for ZombieCursor.
+"""
+import os
+import tempfile
+import pytest
+
+
+# Settings are read at import time, so point the memory store and log file
+# at a scratch directory before any test imports the core modules
+_TEST_DIR = tempfile.mkdtemp(prefix="zombiecursor-tests-")
+os.environ.setdefault("VECTOR_STORE_PATH", os.path.join(_TEST_DIR, "vectorstores"))
+os.environ.setdefault("LOG_FILE", os.path.join(_TEST_DIR, "zombiecursor.log"))
+
+
+class FakeClock:
+    """Stand-in for time.monotonic that only moves when told to."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(clock_module, monkeypatch):
+    """Replace time.monotonic, as seen by clock_module, with a FakeClock.
+    
+    Test modules using this fixture define a clock_module fixture returning
+    the module under test.
+    """
+    fake = FakeClock()
+    monkeypatch.setattr(clock_module.time, "monotonic", fake)
+    return fake
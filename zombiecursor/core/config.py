@@ -2,9 +2,10 @@
 Core configuration management for ZombieCursor.
 """
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
 
@@ -37,6 +38,11 @@ class Settings(BaseSettings):
     redis_port: int = Field(default=6379, env="REDIS_PORT")
     redis_db: int = Field(default=0, env="REDIS_DB")
     
+    # LLM Response Cache (Redis)
+    enable_llm_cache: bool = Field(default=False, env="ENABLE_LLM_CACHE")
+    llm_cache_ttl: int = Field(default=3600, env="LLM_CACHE_TTL")
+    llm_cache_stale_ttl: int = Field(default=86400, env="LLM_CACHE_STALE_TTL")
+    
     # Logging Configuration
     log_level: str = Field(default="INFO", env="LOG_LEVEL")
     log_file: str = Field(default="logs/zombiecursor.log", env="LOG_FILE")
@@ -52,6 +58,7 @@ class Settings(BaseSettings):
     default_agent: str = Field(default="coder", env="DEFAULT_AGENT")
     enable_streaming: bool = Field(default=True, env="ENABLE_STREAMING")
     enable_memory: bool = Field(default=True, env="ENABLE_MEMORY")
+    max_batch_concurrency: int = Field(default=32, env="MAX_BATCH_CONCURRENCY")
     
     # Vector Store Configuration
     vector_store_path: str = Field(default="./vectorstores/data", env="VECTOR_STORE_PATH")
@@ -63,17 +70,27 @@ class Settings(BaseSettings):
     enable_system_tool: bool = Field(default=True, env="ENABLE_SYSTEM_TOOL")
     python_timeout: int = Field(default=30, env="PYTHON_TIMEOUT")
     
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        frozen=True
+    )
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        # Ensure log directory exists
+    def ensure_dirs(self) -> None:
+        """Create the log and vector store directories if missing.
+        
+        Only called by code that writes there, so importing the settings
+        has no filesystem side effects.
+        """
         Path(self.log_file).parent.mkdir(parents=True, exist_ok=True)
-        # Ensure vector store directory exists
         Path(self.vector_store_path).parent.mkdir(parents=True, exist_ok=True)
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get the process-wide settings instance."""
+    return Settings()
+
+
 # Global settings instance
-settings = Settings()
\ No newline at end of file
+settings = get_settings()
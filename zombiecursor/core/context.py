@@ -2,17 +2,28 @@
 Project context loader for ZombieCursor agents.
 """
 import os
+import re
 import glob
+import fnmatch
+import pathspec
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Union
 from core.config import settings
 from core.logging_config import log
+from core.interfaces import ProjectFile, ProjectContextSnapshot
 from core.utils import (
-    is_text_file, is_git_ignored, parse_gitignore, 
-    get_file_info, get_project_languages, find_files_by_pattern
+    is_text_file, gitignore_spec,
+    get_file_info, get_project_languages, find_files_by_pattern,
+    iter_file_entries
 )
 
 
+# Shared pool for reading important files concurrently
+_READ_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix='zc-read')
+
+
 class ProjectContext:
     """Loads and manages project context for agents."""
     
@@ -24,6 +35,7 @@ class ProjectContext:
         # Cache for performance
         self._cache = {}
         self._cache_timestamp = None
+        self._is_git: Optional[bool] = None
         
         # Exclude patterns
         self.exclude_patterns = [
@@ -33,23 +45,44 @@ class ProjectContext:
             '.tox', 'coverage.xml', '*.egg-info'
         ]
         
-        # Add gitignore patterns
-        gitignore_patterns = parse_gitignore(self.base_path)
-        self.exclude_patterns.extend(gitignore_patterns)
+        # Compile the exclude patterns once, with gitignore semantics
+        # (anchoring, trailing '/', '**' and '!' negation)
+        self._default_exclude_spec = pathspec.PathSpec.from_lines('gitwildmatch', self.exclude_patterns)
+        
+        # is_text_file results by file extension
+        self._text_ext_cache: Dict[str, bool] = {}
+        
+        # Directory exclusion decisions, memoized per instance: many files
+        # share a handful of parent directories
+        self._dir_excluded = lru_cache(maxsize=4096)(self._check_dir_excluded)
+        
+        # Default excludes combined with the project's shared gitignore spec
+        self._gitignore: Optional[pathspec.PathSpec] = None
+        self._exclude_spec = self._default_exclude_spec
+        self._refresh_exclude_spec()
         
         log.info(f"ProjectContext initialized for: {self.base_path}")
     
     def collect(self, force_refresh: bool = False) -> str:
         """Collect project context as a formatted string."""
         try:
+            self._refresh_exclude_spec()
+            
             # Check cache
             if not force_refresh and self._is_cache_valid():
                 return self._cache.get('context', '')
             
+            # Snapshot mtimes before collecting, so concurrent edits invalidate
+            mtimes = self._get_watched_mtimes()
+            
             context_parts = []
             
+            # Walk the tree once and share the file list; the walk records the
+            # mtime of every directory it visits
+            all_files = self._get_all_files(mtimes)
+            
             # Add project overview
-            overview = self._get_project_overview()
+            overview = self._get_project_overview(all_files)
             if overview:
                 context_parts.append(overview)
             
@@ -59,7 +92,8 @@ class ProjectContext:
                 context_parts.append(file_structure)
             
             # Add important files content
-            important_files = self._get_important_files_content()
+            project_files = self._read_important_files()
+            important_files = self._get_important_files_content(project_files)
             if important_files:
                 context_parts.append(important_files)
             
@@ -73,7 +107,14 @@ class ProjectContext:
             # Update cache
             self._cache = {
                 'context': full_context,
-                'timestamp': self._get_current_timestamp()
+                'snapshot': ProjectContextSnapshot(
+                    files=project_files,
+                    root_path=str(self.base_path),
+                    total_files=len(all_files),
+                    total_size=sum(project_file.size for project_file in project_files)
+                ),
+                'timestamp': self._get_current_timestamp(),
+                'mtimes': mtimes
             }
             
             log.debug(f"Collected project context: {len(full_context)} characters")
@@ -83,30 +124,62 @@ class ProjectContext:
             log.error(f"Error collecting project context: {str(e)}")
             return f"Error collecting project context: {str(e)}"
     
+    def snapshot(self, force_refresh: bool = False) -> Optional[ProjectContextSnapshot]:
+        """Collect project context as structured data.
+        
+        The snapshot holds the important files that go into the formatted
+        context, so callers can use them without re-parsing the string.
+        """
+        self.collect(force_refresh)
+        return self._cache.get('snapshot')
+    
     def _is_cache_valid(self) -> bool:
         """Check if cache is still valid."""
-        if not self._cache or 'timestamp' not in self._cache:
+        if not self._cache or 'mtimes' not in self._cache:
             return False
         
-        # Cache is valid for 5 minutes
-        cache_age = self._get_current_timestamp() - self._cache['timestamp']
-        return cache_age < 300  # 5 minutes
+        # Cache is valid until a watched path changes
+        for path, mtime in self._cache['mtimes'].items():
+            try:
+                if os.stat(path, follow_symlinks=False).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+    
+    def _get_watched_mtimes(self) -> Dict[str, int]:
+        """Get mtimes of the important files, whose content is part of the context.
+        
+        Directory mtimes are added by _get_all_files: a directory's mtime
+        changes when entries are added, removed or renamed in it.
+        """
+        mtimes = {}
+        for file_path in self._find_important_files():
+            try:
+                mtimes[str(file_path)] = os.stat(file_path, follow_symlinks=False).st_mtime_ns
+            except OSError:
+                continue
+        
+        return mtimes
     
     def _get_current_timestamp(self) -> float:
         """Get current timestamp."""
         import time
         return time.time()
     
-    def _get_project_overview(self) -> str:
+    def _get_project_overview(self, all_files: Optional[List[Path]] = None) -> str:
         """Get project overview information."""
         try:
+            if all_files is None:
+                all_files = self._get_all_files()
+            
             overview_parts = []
             
             # Basic info
             overview_parts.append(f"Project Root: {self.base_path}")
             
             # Languages
-            languages = get_project_languages(self.base_path)
+            languages = get_project_languages(self.base_path, all_files)
             if languages:
                 lang_list = ', '.join([f"{lang} ({count})" for lang, count in languages.items()])
                 overview_parts.append(f"Languages: {lang_list}")
@@ -114,24 +187,14 @@ class ProjectContext:
             # Git info
             if self._is_git_repository():
                 overview_parts.append("Git Repository: Yes")
-                try:
-                    import subprocess
-                    result = subprocess.run(
-                        ['git', 'branch', '--show-current'],
-                        cwd=self.base_path,
-                        capture_output=True,
-                        text=True,
-                        timeout=5
-                    )
-                    if result.returncode == 0:
-                        overview_parts.append(f"Current Branch: {result.stdout.strip()}")
-                except Exception:
-                    pass
+                branch = self._get_current_branch()
+                if branch:
+                    overview_parts.append(f"Current Branch: {branch}")
             else:
                 overview_parts.append("Git Repository: No")
             
             # File counts
-            total_files = len(self._get_all_files())
+            total_files = len(all_files)
             overview_parts.append(f"Total Files: {total_files}")
             
             return "Project Overview:\n" + "\n".join(f"  {part}" for part in overview_parts)
@@ -156,41 +219,46 @@ class ProjectContext:
             log.error(f"Error getting file structure: {str(e)}")
             return ""
     
-    def _build_tree(self, path: Path, prefix: str = "", max_depth: int = 3) -> List[str]:
+    def _build_tree(self, path: Union[str, Path], prefix: str = "", max_depth: int = 3) -> List[str]:
         """Build directory tree representation."""
         try:
             if max_depth <= 0:
                 return []
             
-            lines = []
-            
+            # Sort keys are extracted once per entry from the cached DirEntry type
             try:
-                items = sorted(path.iterdir(), key=lambda x: (x.is_file(), x.name.lower()))
+                with os.scandir(path) as entries:
+                    items = []
+                    for entry in entries:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        rel_path = os.path.relpath(entry.path, self.base_path)
+                        if not self._is_excluded(rel_path, is_dir):
+                            items.append((not is_dir, entry.name.lower(), entry.name, is_dir, entry.path))
             except PermissionError:
                 return [f"{prefix}[Permission Denied]"]
             
-            for i, item in enumerate(items):
-                if self._should_exclude(item):
-                    continue
-                
-                is_last = i == len(items) - 1
-                current_prefix = "└── " if is_last else "├── "
-                child_prefix = "    " if is_last else "│   "
+            if not items:
+                return []
+            items.sort()
+            
+            lines = []
+            branch, child_prefix = f"{prefix}├── ", f"{prefix}│   "
+            last_index = len(items) - 1
+            descend = max_depth > 1
+            
+            for i, (_, _, name, is_dir, entry_path) in enumerate(items):
+                if i == last_index:
+                    branch, child_prefix = f"{prefix}└── ", f"{prefix}    "
                 
-                if item.is_dir():
-                    lines.append(f"{prefix}{current_prefix}{item.name}/")
+                if is_dir:
+                    lines.append(f"{branch}{name}/")
                     
                     # Recurse into subdirectories
-                    if max_depth > 1:
-                        child_lines = self._build_tree(
-                            item, 
-                            prefix + child_prefix, 
-                            max_depth - 1
-                        )
-                        lines.extend(child_lines)
+                    if descend:
+                        lines.extend(self._build_tree(entry_path, child_prefix, max_depth - 1))
                 
                 else:
-                    lines.append(f"{prefix}{current_prefix}{item.name}")
+                    lines.append(f"{branch}{name}")
             
             return lines
             
@@ -198,33 +266,18 @@ class ProjectContext:
             log.error(f"Error building tree for {path}: {str(e)}")
             return [f"{prefix}[Error: {str(e)}]"]
     
-    def _get_important_files_content(self) -> str:
+    def _get_important_files_content(self, project_files: Optional[List[ProjectFile]] = None) -> str:
         """Get content of important files."""
         try:
-            important_files = self._find_important_files()
-            if not important_files:
+            if project_files is None:
+                project_files = self._read_important_files()
+            if not project_files:
                 return ""
             
             content_parts = ["Important Files:"]
-            
-            for file_path in important_files:
-                try:
-                    file_info = get_file_info(file_path)
-                    if file_info.get('is_text') and file_info.get('size', 0) < 10000:  # 10KB limit
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            file_content = f.read()
-                        
-                        # Truncate very long files
-                        if len(file_content) > 2000:
-                            file_content = file_content[:2000] + "\n...[truncated]"
-                        
-                        relative_path = file_path.relative_to(self.base_path)
-                        content_parts.append(f"\n# FILE: {relative_path}")
-                        content_parts.append(file_content)
-                
-                except Exception as e:
-                    log.debug(f"Error reading file {file_path}: {str(e)}")
-                    continue
+            for project_file in project_files:
+                content_parts.append(f"\n# FILE: {project_file.path}")
+                content_parts.append(project_file.content)
             
             return "\n".join(content_parts)
             
@@ -232,6 +285,50 @@ class ProjectContext:
             log.error(f"Error getting important files content: {str(e)}")
             return ""
     
+    def _read_important_files(self) -> List[ProjectFile]:
+        """Read the important files of the project."""
+        try:
+            important_files = self._find_important_files()
+            if not important_files:
+                return []
+            
+            # Read files concurrently to overlap disk latency, keeping their order
+            project_files = list(_READ_POOL.map(self._read_important_file, important_files))
+            
+            return [project_file for project_file in project_files if project_file]
+            
+        except Exception as e:
+            log.error(f"Error reading important files: {str(e)}")
+            return []
+    
+    def _read_important_file(self, file_path: Path) -> Optional[ProjectFile]:
+        """Read an important file, or None if it is skipped."""
+        try:
+            stat = os.stat(file_path)
+            if self._is_text_name(file_path.name) and stat.st_size < 10000:  # 10KB limit
+                return ProjectFile(
+                    path=str(file_path.relative_to(self.base_path)),
+                    # Read only the head of very long files
+                    content=self._read_head(file_path, 2000),
+                    size=stat.st_size,
+                    last_modified=stat.st_mtime
+                )
+        
+        except Exception as e:
+            log.debug(f"Error reading file {file_path}: {str(e)}")
+        return None
+    
+    @staticmethod
+    def _read_head(file_path: Path, limit: int) -> str:
+        """Read at most limit bytes of a file, marking it if truncated."""
+        with open(file_path, 'rb') as f:
+            data = f.read(limit + 1)
+        
+        content = data[:limit].decode('utf-8', errors='ignore')
+        if len(data) > limit:
+            content += "\n...[truncated]"
+        return content
+    
     def _find_important_files(self) -> List[Path]:
         """Find important files in the project."""
         important_patterns = [
@@ -243,28 +340,61 @@ class ProjectContext:
             'main.py', 'app.py', 'index.js', 'index.ts',
             '__init__.py'
         ]
+        important_re = [re.compile(fnmatch.translate(pattern)) for pattern in important_patterns]
         
-        important_files = []
+        # One scandir of the project root, ordered by the first matching pattern
+        matches = []
+        try:
+            with os.scandir(self.base_path) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+                    rank = next(
+                        (i for i, pattern_re in enumerate(important_re) if pattern_re.match(entry.name)),
+                        None
+                    )
+                    if rank is None:
+                        continue
+                    file_path = Path(entry.path)
+                    if not self._should_exclude(file_path):
+                        matches.append((rank, entry.name, file_path))
+        except OSError as e:
+            log.debug(f"Error scanning {self.base_path}: {str(e)}")
         
-        for pattern in important_patterns:
-            files = list(self.base_path.glob(pattern))
-            for file_path in files:
-                if file_path.is_file() and not self._should_exclude(file_path):
-                    important_files.append(file_path)
+        matches.sort(key=lambda match: (match[0], match[1]))
+        important_files = [file_path for _, _, file_path in matches]
         
         # Limit number of files
         return important_files[:self.max_files // 2]
     
-    def _get_all_files(self) -> List[Path]:
-        """Get all files in the project."""
+    def _get_all_files(self, dir_mtimes: Optional[Dict[str, int]] = None) -> List[Path]:
+        """Get all files in the project, recording visited directory mtimes into dir_mtimes."""
         try:
             all_files = []
+            base = str(self.base_path)
+            stack = [base]
             
-            for file_path in self.base_path.rglob('*'):
-                if (file_path.is_file() and 
-                    is_text_file(file_path) and 
-                    not self._should_exclude(file_path)):
-                    all_files.append(file_path)
+            while stack:
+                directory = stack.pop()
+                try:
+                    # Stat before listing, so entries changed during the scan invalidate
+                    if dir_mtimes is not None:
+                        dir_mtimes[directory] = os.stat(directory, follow_symlinks=False).st_mtime_ns
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            rel_path = os.path.relpath(entry.path, base)
+                            if self._is_excluded(rel_path, is_dir):
+                                continue
+                            
+                            # Excluded directories are pruned, never descended into
+                            if is_dir:
+                                stack.append(entry.path)
+                            elif (entry.is_file(follow_symlinks=False) and
+                                  self._is_text_name(entry.name)):
+                                all_files.append(Path(entry.path))
+                except OSError as e:
+                    log.debug(f"Error scanning {directory}: {str(e)}")
             
             return all_files
             
@@ -272,32 +402,96 @@ class ProjectContext:
             log.error(f"Error getting all files: {str(e)}")
             return []
     
+    def _refresh_exclude_spec(self) -> None:
+        """Rebuild the combined exclude spec if the project's gitignore rules changed."""
+        gitignore = gitignore_spec(self.base_path)
+        if gitignore is self._gitignore:
+            return
+        
+        self._gitignore = gitignore
+        if gitignore is None:
+            self._exclude_spec = self._default_exclude_spec
+        else:
+            self._exclude_spec = self._default_exclude_spec + gitignore
+        self._dir_excluded.cache_clear()
+    
+    def _is_excluded(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Check a path relative to the project root against the exclude patterns and gitignore."""
+        rel_path = rel_path.replace(os.sep, '/')
+        return self._exclude_spec.match_file(f"{rel_path}/" if is_dir else rel_path)
+    
+    def _check_dir_excluded(self, rel_dir: str) -> bool:
+        """Check if a directory or any of its parents is excluded."""
+        parent, name = os.path.split(rel_dir)
+        if parent and parent != rel_dir and self._dir_excluded(parent):
+            return True
+        return bool(name) and self._is_excluded(rel_dir, is_dir=True)
+    
+    def _is_text_name(self, name: str) -> bool:
+        """Check if a file name looks like a text file, cached by extension."""
+        ext = os.path.splitext(name)[1]
+        is_text = self._text_ext_cache.get(ext)
+        if is_text is None:
+            is_text = self._text_ext_cache[ext] = is_text_file(Path(name))
+        return is_text
+    
     def _should_exclude(self, path: Path) -> bool:
         """Check if a path should be excluded."""
         try:
-            # Check against exclude patterns
-            for pattern in self.exclude_patterns:
-                if path.match(pattern):
-                    return True
-                
-                # Check parent directories
-                for parent in path.parents:
-                    if parent.match(pattern):
-                        return True
+            try:
+                rel_path = path.relative_to(self.base_path).as_posix()
+            except ValueError:
+                rel_path = path.as_posix()
+            
+            # Parent directories are checked once and memoized
+            parent, name = os.path.split(rel_path)
+            if parent and parent != rel_path and self._dir_excluded(parent):
+                return True
             
-            # Check gitignore
-            return is_git_ignored(path, self.base_path)
+            return self._is_excluded(rel_path, path.is_dir())
             
         except Exception:
             return False
     
     def _is_git_repository(self) -> bool:
         """Check if the project is a git repository."""
-        return (self.base_path / '.git').exists()
+        if self._is_git is None:
+            self._is_git = (self.base_path / '.git').exists()
+        return self._is_git
+    
+    def _get_current_branch(self) -> Optional[str]:
+        """Get the current git branch by reading .git/HEAD directly."""
+        try:
+            head = (self.base_path / '.git' / 'HEAD').read_text().strip()
+            if head.startswith('ref: refs/heads/'):
+                return head[16:]
+            if head:
+                # Detached HEAD, show the abbreviated commit
+                return head[:12]
+        except Exception:
+            pass
+        
+        # Fall back to git itself, e.g. when .git is a worktree file
+        try:
+            import subprocess
+            result = subprocess.run(
+                ['git', 'branch', '--show-current'],
+                cwd=self.base_path,
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+            if result.returncode == 0:
+                return result.stdout.strip()
+        except Exception:
+            pass
+        return None
     
     def get_file_context(self, file_path: str, include_surrounding: bool = True) -> str:
         """Get context for a specific file."""
         try:
+            self._refresh_exclude_spec()
+            
             full_path = self.base_path / file_path
             
             if not full_path.exists():
@@ -315,12 +509,8 @@ class ProjectContext:
             
             # File content
             if file_info.get('is_text'):
-                with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                
-                # Truncate if too large
-                if len(content) > 5000:
-                    content = content[:5000] + "\n...[truncated]"
+                # Read only the head of large files
+                content = self._read_head(full_path, 5000)
                 
                 context_parts.append(f"\nContent:\n{content}")
             
@@ -370,6 +560,8 @@ class ProjectContext:
     def search_files(self, pattern: str, file_types: List[str] = None) -> List[Dict[str, Any]]:
         """Search for files matching a pattern."""
         try:
+            self._refresh_exclude_spec()
+            
             if file_types is None:
                 file_types = ['*']
             
@@ -377,14 +569,14 @@ class ProjectContext:
             
             for file_type in file_types:
                 pattern_path = f"**/{pattern}.{file_type.lstrip('*')}"
-                files = list(self.base_path.glob(pattern_path))
                 
-                for file_path in files:
-                    if (file_path.is_file() and 
-                        is_text_file(file_path) and
+                # Entries come from scandir, their cached stat is reused for the file info
+                for entry in iter_file_entries(self.base_path, pattern_path):
+                    file_path = Path(entry.path)
+                    if (is_text_file(file_path) and
                         not self._should_exclude(file_path)):
                         
-                        file_info = get_file_info(file_path)
+                        file_info = get_file_info(file_path, entry.stat())
                         matching_files.append(file_info)
             
             return matching_files
@@ -396,7 +588,9 @@ class ProjectContext:
     def get_language_stats(self) -> Dict[str, Any]:
         """Get language statistics for the project."""
         try:
-            languages = get_project_languages(self.base_path)
+            self._refresh_exclude_spec()
+            
+            languages = get_project_languages(self.base_path, self._get_all_files())
             
             stats = {
                 'languages': languages,
@@ -415,4 +609,8 @@ class ProjectContext:
         """Clear the context cache."""
         self._cache = {}
         self._cache_timestamp = None
+        self._is_git = None
+        self._gitignore = None
+        self._exclude_spec = self._default_exclude_spec
+        self._dir_excluded.cache_clear()
         log.info("Project context cache cleared")
\ No newline at end of file
@@ -15,15 +15,19 @@ class AgentType(Enum):
     EXPLAINER = "explainer"
 
 
-class MessageRole(Enum):
-    """Message roles in conversations."""
+class MessageRole(str, Enum):
+    """Message roles in conversations.
+    
+    Members are str instances, so they compare equal to and serialize as
+    their wire value.
+    """
     SYSTEM = "system"
     USER = "user"
     ASSISTANT = "assistant"
     TOOL = "tool"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Message:
     """A message in the conversation."""
     role: MessageRole
@@ -31,7 +35,7 @@ class Message:
     metadata: Optional[Dict[str, Any]] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AgentRequest:
     """Request payload for agent execution."""
     query: str
@@ -41,7 +45,7 @@ class AgentRequest:
     metadata: Optional[Dict[str, Any]] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AgentResponse:
     """Response from agent execution."""
     agent_type: AgentType
@@ -50,7 +54,7 @@ class AgentResponse:
     error: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ProjectFile:
     """Represents a file in the project."""
     path: str
@@ -59,8 +63,8 @@ class ProjectFile:
     last_modified: float
 
 
-@dataclass
-class ProjectContext:
+@dataclass(slots=True, frozen=True)
+class ProjectContextSnapshot:
     """Project context information."""
     files: List[ProjectFile]
     root_path: str
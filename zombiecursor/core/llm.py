@@ -2,16 +2,100 @@
 Local LLM adapter for ZombieCursor.
 Supports both Llama.cpp and Ollama backends.
 """
-import json
-import uuid
+import os
+import time
+import itertools
+import hashlib
 import asyncio
-from typing import List, Dict, Any, AsyncGenerator
-import requests
+from typing import List, Dict, Any, AsyncGenerator, Optional
+import httpx
+import orjson
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
 from core.interfaces import LLMProvider, Message, MessageRole
 from core.config import settings
 from core.logging_config import log
 
 
+# Request bodies are serialized with orjson and sent as raw content
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Shared HTTP client, keeps keep-alive connections to the LLM backend
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        # HTTP/2 is negotiated via ALPN for https hosts; plain http stays on
+        # HTTP/1.1 keep-alive
+        _client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=32,
+                max_keepalive_connections=16,
+                keepalive_expiry=60.0
+            )
+        )
+    return _client
+
+
+# In-flight chat requests, shared by identical concurrent calls
+_inflight: Dict[str, "asyncio.Task[str]"] = {}
+
+# Responses are only cached for (near) deterministic sampling
+_CACHE_MAX_TEMPERATURE = 0.3
+
+# Shared Redis client for the LLM response cache
+_redis: Optional[aioredis.Redis] = None
+
+
+def _get_redis() -> aioredis.Redis:
+    """Get the shared Redis client, creating it on first use."""
+    global _redis
+    if _redis is None:
+        _redis = aioredis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            decode_responses=True
+        )
+    return _redis
+
+
+async def close_client() -> None:
+    """Close the shared HTTP and Redis clients."""
+    global _client, _redis
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+async def _aiter_byte_lines(response: httpx.Response) -> AsyncGenerator[bytes, None]:
+    """Iterate over the non-empty lines of a streamed response as bytes.
+    
+    Splitting is done on the raw bytes with one growing buffer, so no text
+    decoding happens per line; orjson parses the bytes directly.
+    """
+    buf = bytearray()
+    async for chunk in response.aiter_bytes():
+        buf.extend(chunk)
+        start = 0
+        while (nl := buf.find(b"\n", start)) != -1:
+            line = bytes(buf[start:nl]).rstrip(b"\r")
+            start = nl + 1
+            if line:
+                yield line
+        del buf[:start]
+    
+    if buf.strip():
+        yield bytes(buf).rstrip(b"\r")
+
+
 class LocalLLM(LLMProvider):
     """Local LLM provider supporting multiple backends."""
     
@@ -32,52 +116,129 @@ class LocalLLM(LLMProvider):
         else:
             self.use_ollama = False
             log.info(f"Using Llama.cpp backend at {self.host}")
+        
+        # Request ids only need to be unique per process
+        self._pid = os.getpid()
+        self._id_counter = itertools.count()
+    
+    def _next_request_id(self) -> str:
+        """Get a cheap, process-unique request id."""
+        return f"{self._pid}-{next(self._id_counter)}"
+    
+    def _format_messages(self, messages: List[Message]) -> List[Dict[str, Any]]:
+        """Format messages for LLM API.
+        
+        MessageRole members are already str values, so they go into the
+        payload as they are; only role and content are sent.
+        """
+        return [{"role": msg.role, "content": msg.content} for msg in messages]
+    
+    def _request_key(self, formatted_messages: List[Dict[str, Any]]) -> str:
+        """Build a key identifying an upstream chat request."""
+        raw = orjson.dumps(
+            [self.host, self.model, self.temperature, self.max_tokens, formatted_messages],
+            option=orjson.OPT_SORT_KEYS
+        )
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+    
+    async def _dispatch_chat(self, formatted_messages: List[Dict[str, Any]]) -> str:
+        """Send a chat request to the configured backend."""
+        if self.use_ollama:
+            return await self._chat_ollama(formatted_messages)
+        else:
+            return await self._chat_llamacpp(formatted_messages)
+    
+    def _use_cache(self) -> bool:
+        """Check if responses for this LLM may be cached."""
+        return settings.enable_llm_cache and self.temperature <= _CACHE_MAX_TEMPERATURE
     
-    def _format_messages(self, messages: List[Message]) -> List[Dict[str, str]]:
-        """Format messages for LLM API."""
-        formatted = []
-        for msg in messages:
-            formatted.append({
-                "role": msg.role.value,
-                "content": msg.content
+    async def _cached_chat(self, key: str, formatted_messages: List[Dict[str, Any]]) -> str:
+        """Send a chat request through the Redis response cache.
+        
+        Entries are fresh for llm_cache_ttl seconds. Stale entries are kept
+        for llm_cache_stale_ttl more seconds and served only if the backend
+        call fails.
+        """
+        if not self._use_cache():
+            return await self._dispatch_chat(formatted_messages)
+        
+        cache_key = f"llm:{self.model}:{key}"
+        entry: Dict[str, str] = {}
+        try:
+            entry = await _get_redis().hgetall(cache_key)
+            if entry and time.time() < float(entry["stale_at"]):
+                return entry["response"]
+        except (RedisError, OSError, KeyError, ValueError) as e:
+            log.debug(f"LLM cache lookup failed: {str(e)}")
+        
+        try:
+            response = await self._dispatch_chat(formatted_messages)
+        except Exception as e:
+            if entry.get("response") is not None:
+                log.warning(f"LLM request failed, serving stale cached response: {str(e)}")
+                return entry["response"]
+            raise
+        
+        now = time.time()
+        try:
+            redis_client = _get_redis()
+            await redis_client.hset(cache_key, mapping={
+                "response": response,
+                "generated_at": now,
+                "stale_at": now + settings.llm_cache_ttl,
+                "status": "ok"
             })
-        return formatted
+            await redis_client.expire(cache_key, settings.llm_cache_ttl + settings.llm_cache_stale_ttl)
+        except (RedisError, OSError) as e:
+            log.debug(f"LLM cache store failed: {str(e)}")
+        
+        return response
     
     async def chat(self, messages: List[Message]) -> str:
-        """Send chat messages and get response."""
+        """Send chat messages and get response.
+        
+        Identical requests issued while one is already in flight share the
+        same upstream call instead of each making their own.
+        """
         try:
             formatted_messages = self._format_messages(messages)
+            key = self._request_key(formatted_messages)
             
-            if self.use_ollama:
-                return await self._chat_ollama(formatted_messages)
-            else:
-                return await self._chat_llamacpp(formatted_messages)
+            task = _inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._cached_chat(key, formatted_messages))
+                _inflight[key] = task
+                task.add_done_callback(lambda _: _inflight.pop(key, None))
+            
+            # Shield so one cancelled caller does not cancel the shared call
+            return await asyncio.shield(task)
                 
         except Exception as e:
             log.error(f"LLM chat error: {str(e)}")
             raise
     
-    async def _chat_llamacpp(self, messages: List[Dict[str, str]]) -> str:
+    async def _chat_llamacpp(self, messages: List[Dict[str, Any]]) -> str:
         """Chat with Llama.cpp backend."""
         payload = {
-            "id": str(uuid.uuid4()),
+            "id": self._next_request_id(),
             "messages": messages,
             "stream": False,
             "max_tokens": self.max_tokens,
             "temperature": self.temperature
         }
         
-        response = requests.post(
+        response = await _get_client().post(
             f"{self.host}/v1/chat/completions",
-            json=payload,
+            content=orjson.dumps(payload),
+            headers=_JSON_HEADERS,
             timeout=self.timeout
         )
         response.raise_for_status()
         
-        result = response.json()
+        result = orjson.loads(response.content)
         return result["choices"][0]["message"]["content"]
     
-    async def _chat_ollama(self, messages: List[Dict[str, str]]) -> str:
+    async def _chat_ollama(self, messages: List[Dict[str, Any]]) -> str:
         """Chat with Ollama backend."""
         payload = {
             "model": self.model,
@@ -89,14 +250,15 @@ class LocalLLM(LLMProvider):
             }
         }
         
-        response = requests.post(
+        response = await _get_client().post(
             f"{self.host}/api/chat",
-            json=payload,
+            content=orjson.dumps(payload),
+            headers=_JSON_HEADERS,
             timeout=self.timeout
         )
         response.raise_for_status()
         
-        result = response.json()
+        result = orjson.loads(response.content)
         return result["message"]["content"]
     
     async def chat_stream(self, messages: List[Message]) -> AsyncGenerator[str, None]:
@@ -115,41 +277,40 @@ class LocalLLM(LLMProvider):
             log.error(f"LLM chat stream error: {str(e)}")
             raise
     
-    async def _chat_stream_llamacpp(self, messages: List[Dict[str, str]]) -> AsyncGenerator[str, None]:
+    async def _chat_stream_llamacpp(self, messages: List[Dict[str, Any]]) -> AsyncGenerator[str, None]:
         """Stream chat with Llama.cpp backend."""
         payload = {
-            "id": str(uuid.uuid4()),
+            "id": self._next_request_id(),
             "messages": messages,
             "stream": True,
             "max_tokens": self.max_tokens,
             "temperature": self.temperature
         }
         
-        response = requests.post(
+        async with _get_client().stream(
+            "POST",
             f"{self.host}/v1/chat/completions",
-            json=payload,
-            stream=True,
+            content=orjson.dumps(payload),
+            headers=_JSON_HEADERS,
             timeout=self.timeout
-        )
-        response.raise_for_status()
-        
-        for line in response.iter_lines():
-            if line:
-                line = line.decode('utf-8')
-                if line.startswith('data: '):
+        ) as response:
+            response.raise_for_status()
+            
+            async for line in _aiter_byte_lines(response):
+                if line.startswith(b'data: '):
                     data = line[6:]
-                    if data == '[DONE]':
+                    if data == b'[DONE]':
                         break
                     try:
-                        chunk = json.loads(data)
+                        chunk = orjson.loads(data)
                         if 'choices' in chunk and len(chunk['choices']) > 0:
-                            delta = chunk['choices'][0].get('delta', {})
-                            if 'content' in delta:
-                                yield delta['content']
-                    except json.JSONDecodeError:
+                            content = chunk['choices'][0].get('delta', {}).get('content')
+                            if content:
+                                yield content
+                    except orjson.JSONDecodeError:
                         continue
     
-    async def _chat_stream_ollama(self, messages: List[Dict[str, str]]) -> AsyncGenerator[str, None]:
+    async def _chat_stream_ollama(self, messages: List[Dict[str, Any]]) -> AsyncGenerator[str, None]:
         """Stream chat with Ollama backend."""
         payload = {
             "model": self.model,
@@ -161,33 +322,32 @@ class LocalLLM(LLMProvider):
             }
         }
         
-        response = requests.post(
+        async with _get_client().stream(
+            "POST",
             f"{self.host}/api/chat",
-            json=payload,
-            stream=True,
+            content=orjson.dumps(payload),
+            headers=_JSON_HEADERS,
             timeout=self.timeout
-        )
-        response.raise_for_status()
-        
-        for line in response.iter_lines():
-            if line:
-                line = line.decode('utf-8')
+        ) as response:
+            response.raise_for_status()
+            
+            async for line in _aiter_byte_lines(response):
                 try:
-                    chunk = json.loads(line)
+                    chunk = orjson.loads(line)
                     if 'message' in chunk and 'content' in chunk['message']:
                         yield chunk['message']['content']
                     if 'done' in chunk and chunk['done']:
                         break
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     continue
     
     async def health_check(self) -> bool:
         """Check if the LLM backend is healthy."""
         try:
             if self.use_ollama:
-                response = requests.get(f"{self.host}/api/tags", timeout=5)
+                response = await _get_client().get(f"{self.host}/api/tags", timeout=5)
             else:
-                response = requests.get(f"{self.host}/health", timeout=5)
+                response = await _get_client().get(f"{self.host}/health", timeout=5)
             
             return response.status_code == 200
         except Exception as e:
@@ -198,7 +358,7 @@ class LocalLLM(LLMProvider):
         """List available models."""
         try:
             if self.use_ollama:
-                response = requests.get(f"{self.host}/api/tags", timeout=10)
+                response = await _get_client().get(f"{self.host}/api/tags", timeout=10)
                 response.raise_for_status()
                 data = response.json()
                 return [model['name'] for model in data.get('models', [])]
@@ -207,4 +367,8 @@ class LocalLLM(LLMProvider):
                 return [self.model] if await self.health_check() else []
         except Exception as e:
             log.error(f"Failed to list models: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+    
+    async def close(self) -> None:
+        """Close the shared HTTP client used for LLM requests."""
+        await close_client()
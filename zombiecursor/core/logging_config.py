@@ -9,6 +9,8 @@ from core.config import settings
 
 def setup_logging():
     """Set up logging configuration."""
+    settings.ensure_dirs()
+    
     # Remove default logger
     logger.remove()
     
@@ -1,42 +1,145 @@
 """
 Memory management for ZombieCursor agents.
 """
-import json
+import time
+import atexit
+import asyncio
+import sqlite3
 import hashlib
+import orjson
 from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 from core.interfaces import MemoryStore
 from core.config import settings
 from core.logging_config import log
 
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    ts REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS memory_ts ON memory(ts);
+"""
+
+# Text indexed for a stored JSON value: its string leaves, so key names
+# like "query" and "response" are neither matched nor counted by bm25
+_INDEXED_TEXT = "(SELECT group_concat(j.value, ' ') FROM json_tree({}) AS j WHERE j.type = 'text')"
+
+# Contentless full-text index over the stored values, kept in sync by triggers
+_FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(
+    text, content='', tokenize='unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS memory_ai AFTER INSERT ON memory BEGIN
+    INSERT INTO memory_fts(rowid, text) VALUES (new.rowid, {_INDEXED_TEXT.format('new.value')});
+END;
+CREATE TRIGGER IF NOT EXISTS memory_ad AFTER DELETE ON memory BEGIN
+    INSERT INTO memory_fts(memory_fts, rowid, text)
+    VALUES ('delete', old.rowid, {_INDEXED_TEXT.format('old.value')});
+END;
+CREATE TRIGGER IF NOT EXISTS memory_au AFTER UPDATE OF value ON memory BEGIN
+    INSERT INTO memory_fts(memory_fts, rowid, text)
+    VALUES ('delete', old.rowid, {_INDEXED_TEXT.format('old.value')});
+    INSERT INTO memory_fts(rowid, text) VALUES (new.rowid, {_INDEXED_TEXT.format('new.value')});
+END;
+"""
+
+# Bumped (in PRAGMA user_version) whenever the index layout changes, so
+# existing databases drop and rebuild it
+_FTS_VERSION = 1
+_FTS_DROP = """
+DROP TRIGGER IF EXISTS memory_ai;
+DROP TRIGGER IF EXISTS memory_ad;
+DROP TRIGGER IF EXISTS memory_au;
+DROP TABLE IF EXISTS memory_fts;
+"""
+
+# Writes are committed in batches: at most this long after the first
+# uncommitted change, or once this many changes are pending
+_FLUSH_DELAY = 0.25
+_FLUSH_MAX_PENDING = 100
+
+
 class SimpleMemoryStore(MemoryStore):
-    """Simple file-based memory store."""
+    """Simple file-based memory store, backed by SQLite with an FTS5 index."""
     
     def __init__(self):
         self.memory_dir = Path(settings.vector_store_path)
         self.memory_dir.mkdir(parents=True, exist_ok=True)
-        self.memory_file = self.memory_dir / "memory.json"
-        self.memory_data = self._load_memory()
+        self.memory_file = self.memory_dir / "memory.db"
+        self.legacy_memory_file = self.memory_dir / "memory.json"
+        self._fts = True
+        self._pending = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._conn = self._connect()
+        self._migrate_legacy_memory()
+        
+        # Running entry count and timestamp sum, so get_stats needs no full scan
+        self._count, self._ts_sum = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(ts), 0) FROM memory"
+        ).fetchone()
     
-    def _load_memory(self) -> Dict[str, Any]:
-        """Load memory from file."""
+    def _connect(self) -> sqlite3.Connection:
+        """Open the memory database and create the schema."""
+        conn = sqlite3.connect(self.memory_file, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
         try:
-            if self.memory_file.exists():
-                with open(self.memory_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
-            log.error(f"Failed to load memory: {str(e)}")
-        return {}
+            outdated = conn.execute("PRAGMA user_version").fetchone()[0] < _FTS_VERSION
+            if outdated:
+                conn.executescript(_FTS_DROP)
+            conn.executescript(_FTS_SCHEMA)
+            if outdated:
+                conn.execute(
+                    f"INSERT INTO memory_fts(rowid, text) "
+                    f"SELECT rowid, {_INDEXED_TEXT.format('memory.value')} FROM memory"
+                )
+                conn.execute(f"PRAGMA user_version = {_FTS_VERSION}")
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5, fall back to substring search
+            log.warning(f"FTS5 unavailable, memory search falls back to LIKE: {str(e)}")
+            self._fts = False
+        conn.commit()
+        return conn
     
-    def _save_memory(self) -> None:
-        """Save memory to file."""
+    def _migrate_legacy_memory(self) -> None:
+        """Import entries from the old memory.json file, once."""
+        if not self.legacy_memory_file.exists():
+            return
         try:
-            with open(self.memory_file, 'w', encoding='utf-8') as f:
-                json.dump(self.memory_data, f, indent=2, ensure_ascii=False)
+            if self._conn.execute("SELECT 1 FROM memory LIMIT 1").fetchone():
+                return
+            legacy = orjson.loads(self.legacy_memory_file.read_bytes())
+            
+            rows = []
+            for key, entry in legacy.items():
+                rows.append((
+                    key,
+                    self._dumps(entry['value']),
+                    datetime.fromisoformat(entry['timestamp']).timestamp(),
+                    datetime.fromisoformat(entry['accessed']).timestamp()
+                ))
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO memory VALUES (?, ?, ?, ?)", rows)
+            log.info(f"Migrated {len(rows)} memory entries from {self.legacy_memory_file}")
         except Exception as e:
-            log.error(f"Failed to save memory: {str(e)}")
+            log.error(f"Failed to migrate legacy memory: {str(e)}")
+    
+    @staticmethod
+    def _dumps(value: Any) -> str:
+        """Serialize a value for storage."""
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    
+    @staticmethod
+    def _isoformat(ts: float) -> str:
+        """Format a stored timestamp for display."""
+        return datetime.fromtimestamp(ts).isoformat()
     
     def _generate_key(self, content: str) -> str:
         """Generate a key for content."""
@@ -45,12 +148,20 @@ class SimpleMemoryStore(MemoryStore):
     async def store(self, key: str, value: Any) -> None:
         """Store a value in memory."""
         try:
-            self.memory_data[key] = {
-                'value': value,
-                'timestamp': datetime.now().isoformat(),
-                'accessed': datetime.now().isoformat()
-            }
-            self._save_memory()
+            now = time.time()
+            previous = self._conn.execute("SELECT ts FROM memory WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT INTO memory(key, value, ts, accessed) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value=excluded.value, ts=excluded.ts, "
+                "accessed=excluded.accessed",
+                (key, self._dumps(value), now, now)
+            )
+            if previous is None:
+                self._count += 1
+                self._ts_sum += now
+            else:
+                self._ts_sum += now - previous[0]
+            self._mark_dirty()
             log.debug(f"Stored memory entry: {key}")
         except Exception as e:
             log.error(f"Failed to store memory entry {key}: {str(e)}")
@@ -58,97 +169,151 @@ class SimpleMemoryStore(MemoryStore):
     async def retrieve(self, key: str) -> Optional[Any]:
         """Retrieve a value from memory."""
         try:
-            if key in self.memory_data:
-                entry = self.memory_data[key]
-                entry['accessed'] = datetime.now().isoformat()
-                self._save_memory()
-                return entry['value']
+            row = self._conn.execute("SELECT value FROM memory WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                # Access times do not need durability, they ride along with the next flush
+                self._conn.execute(
+                    "UPDATE memory SET accessed = ? WHERE key = ?", (time.time(), key)
+                )
+                self._mark_dirty()
+                return orjson.loads(row[0])
         except Exception as e:
             log.error(f"Failed to retrieve memory entry {key}: {str(e)}")
         return None
     
     async def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Search memory for relevant items."""
+        """Search memory for relevant items, ranked by BM25."""
         try:
-            results = []
-            query_lower = query.lower()
-            
-            for key, entry in self.memory_data.items():
-                value_str = str(entry['value']).lower()
-                if query_lower in value_str:
-                    results.append({
-                        'key': key,
-                        'value': entry['value'],
-                        'timestamp': entry['timestamp'],
-                        'accessed': entry['accessed'],
-                        'relevance': self._calculate_relevance(query_lower, value_str)
-                    })
+            if not query.strip():
+                return []
             
-            # Sort by relevance and limit results
-            results.sort(key=lambda x: x['relevance'], reverse=True)
-            return results[:limit]
+            if self._fts:
+                rows = self._conn.execute(
+                    "SELECT m.key, m.value, m.ts, m.accessed, -bm25(memory_fts) "
+                    "FROM memory_fts JOIN memory m ON m.rowid = memory_fts.rowid "
+                    "WHERE memory_fts MATCH ? ORDER BY bm25(memory_fts) LIMIT ?",
+                    (self._match_expression(query), limit)
+                ).fetchall()
+            else:
+                pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                rows = self._conn.execute(
+                    "SELECT key, value, ts, accessed, 1.0 FROM memory "
+                    "WHERE value LIKE ? ESCAPE '\\' ORDER BY accessed DESC LIMIT ?",
+                    (pattern, limit)
+                ).fetchall()
             
+            return [
+                {
+                    'key': key,
+                    'value': orjson.loads(value),
+                    'timestamp': self._isoformat(ts),
+                    'accessed': self._isoformat(accessed),
+                    'relevance': relevance
+                }
+                for key, value, ts, accessed, relevance in rows
+            ]
+        
         except Exception as e:
             log.error(f"Failed to search memory: {str(e)}")
             return []
     
-    def _calculate_relevance(self, query: str, content: str) -> float:
-        """Calculate relevance score for search."""
-        if not query or not content:
-            return 0.0
-        
-        query_words = query.split()
-        content_words = content.split()
+    @staticmethod
+    def _match_expression(query: str) -> str:
+        """Build an FTS5 query requiring every distinct query token.
         
-        matches = sum(1 for word in query_words if word in content_words)
-        return matches / len(query_words) if query_words else 0.0
+        Tokens are deduplicated once per query and quoted, so FTS syntax in
+        the query is not interpreted; the index does the set intersection
+        and bm25 ranks entries by how well they match.
+        """
+        tokens = dict.fromkeys(query.lower().split())
+        return ' '.join('"' + token.replace('"', '""') + '"' for token in tokens)
     
     async def cleanup(self, days: int = 30) -> None:
         """Clean up old memory entries."""
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            cutoff_str = cutoff_date.isoformat()
-            
-            keys_to_remove = []
-            for key, entry in self.memory_data.items():
-                if entry['timestamp'] < cutoff_str:
-                    keys_to_remove.append(key)
-            
-            for key in keys_to_remove:
-                del self.memory_data[key]
+            cutoff = time.time() - days * 86400
+            expired, expired_sum = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(ts), 0) FROM memory WHERE ts < ?", (cutoff,)
+            ).fetchone()
+            if not expired:
+                return
+            removed = self._conn.execute("DELETE FROM memory WHERE ts < ?", (cutoff,)).rowcount
+            self._count -= expired
+            self._ts_sum -= expired_sum
             
-            if keys_to_remove:
-                self._save_memory()
-                log.info(f"Cleaned up {len(keys_to_remove)} old memory entries")
-                
+            if removed:
+                self._mark_dirty()
+                log.info(f"Cleaned up {removed} old memory entries")
+        
         except Exception as e:
             log.error(f"Failed to cleanup memory: {str(e)}")
     
     async def get_stats(self) -> Dict[str, Any]:
         """Get memory statistics."""
         try:
-            total_entries = len(self.memory_data)
+            # MIN and MAX are answered from the ts index, count and sum are kept running
+            total_entries = self._count
+            min_ts = self._conn.execute("SELECT MIN(ts) FROM memory").fetchone()[0]
+            max_ts = self._conn.execute("SELECT MAX(ts) FROM memory").fetchone()[0]
+            avg_ts = self._ts_sum / total_entries if total_entries else 0
             total_size = self.memory_file.stat().st_size if self.memory_file.exists() else 0
             
             # Calculate age statistics
-            now = datetime.now()
-            ages = []
-            for entry in self.memory_data.values():
-                timestamp = datetime.fromisoformat(entry['timestamp'])
-                age = (now - timestamp).days
-                ages.append(age)
-            
+            now = time.time()
             return {
                 'total_entries': total_entries,
                 'total_size_bytes': total_size,
-                'average_age_days': sum(ages) / len(ages) if ages else 0,
-                'oldest_entry_days': max(ages) if ages else 0,
-                'newest_entry_days': min(ages) if ages else 0
+                'average_age_days': (now - avg_ts) / 86400 if total_entries else 0,
+                'oldest_entry_days': int((now - min_ts) // 86400) if total_entries else 0,
+                'newest_entry_days': int((now - max_ts) // 86400) if total_entries else 0
             }
         except Exception as e:
             log.error(f"Failed to get memory stats: {str(e)}")
             return {}
+    
+    def _mark_dirty(self) -> None:
+        """Record an uncommitted change and schedule a flush."""
+        self._pending += 1
+        if self._pending >= _FLUSH_MAX_PENDING:
+            self.flush()
+            return
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to defer to, commit right away
+            self.flush()
+            return
+        
+        # Reschedule if the pending flush belongs to another (closed) loop
+        if self._flush_handle is None or self._flush_loop is not loop:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+            self._flush_handle = loop.call_later(_FLUSH_DELAY, self.flush)
+            self._flush_loop = loop
+    
+    def flush(self) -> None:
+        """Commit pending changes to the memory database."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+            self._flush_loop = None
+        if not self._pending:
+            return
+        
+        try:
+            self._conn.commit()
+            self._pending = 0
+        except Exception as e:
+            log.error(f"Failed to flush memory: {str(e)}")
+    
+    def close(self) -> None:
+        """Flush pending changes and close the memory database."""
+        self.flush()
+        self._conn.close()
 
 
-# Global memory store instance
-memory_store = SimpleMemoryStore()
\ No newline at end of file
+# Global memory store instance, committed on interpreter exit even if the
+# flush timer never got to run
+memory_store = SimpleMemoryStore()
+atexit.register(memory_store.close)
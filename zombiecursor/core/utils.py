@@ -3,21 +3,119 @@ Utility functions for ZombieCursor.
 """
 import os
 import re
+import time
+import mmap
+import fnmatch
 import mimetypes
+import pathspec
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Pattern, Tuple
 from datetime import datetime
-import hashlib
+from blake3 import blake3
+
+
+# Files at least this large are hashed through mmap instead of a single read
+_MMAP_HASH_THRESHOLD = 1024 * 1024
+
+# Shared pool for walking directory trees, its threads start on first use
+_WALK_POOL = ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 2, thread_name_prefix='zc-walk')
+
+# sanitize_filename: invalid characters become '_', control characters are dropped
+_SANITIZE_TABLE = str.maketrans({
+    **{c: '_' for c in '<>:"/\\|?*'},
+    **{c: None for c in range(0x00, 0x20)},
+    **{c: None for c in range(0x7f, 0xa0)}
+})
+
+# Common text file extensions
+TEXT_EXTENSIONS = frozenset({
+    '.py', '.js', '.ts', '.jsx', '.tsx', '.html', '.css', '.scss', '.sass',
+    '.json', '.xml', '.yaml', '.yml', '.toml', '.ini', '.cfg', '.conf',
+    '.md', '.txt', '.rst', '.tex', '.log', '.sql', '.sh', '.bat', '.ps1',
+    '.java', '.c', '.cpp', '.h', '.hpp', '.cs', '.php', '.rb', '.go', '.rs',
+    '.swift', '.kt', '.scala', '.r', '.m', '.pl', '.lua', '.vim', '.dockerfile'
+})
+
+# Languages by file extension, for get_project_languages
+_LANGUAGE_EXTENSIONS = {
+    'Python': ['.py'],
+    'JavaScript': ['.js'],
+    'TypeScript': ['.ts'],
+    'React': ['.jsx'],
+    'React TypeScript': ['.tsx'],
+    'HTML': ['.html', '.htm'],
+    'CSS': ['.css'],
+    'SCSS': ['.scss'],
+    'Java': ['.java'],
+    'C': ['.c'],
+    'C++': ['.cpp', '.cxx', '.cc'],
+    'C#': ['.cs'],
+    'Go': ['.go'],
+    'Rust': ['.rs'],
+    'PHP': ['.php'],
+    'Ruby': ['.rb'],
+    'Swift': ['.swift'],
+    'Kotlin': ['.kt'],
+    'Scala': ['.scala'],
+    'R': ['.r'],
+    'Shell': ['.sh', '.bash', '.zsh'],
+    'PowerShell': ['.ps1'],
+    'Docker': ['.dockerfile', 'Dockerfile'],
+    'SQL': ['.sql'],
+    'Markdown': ['.md'],
+    'YAML': ['.yaml', '.yml'],
+    'JSON': ['.json'],
+    'XML': ['.xml'],
+    'TOML': ['.toml'],
+    'INI': ['.ini', '.cfg', '.conf'],
+}
+
+# Extension (or bare file name) to language, for single lookups per file
+_EXT_TO_LANG = {
+    ext.lower(): lang
+    for lang, extensions in _LANGUAGE_EXTENSIONS.items()
+    for ext in extensions
+}
+
+# Compiled ignore rules per project root, with when their sources were last
+# checked and the mtimes they were built from; sources are re-checked at most
+# every _GITIGNORE_CHECK_INTERVAL seconds instead of per matched path
+_GITIGNORE_CACHE: Dict[str, Tuple[float, List[Optional[int]], Optional[pathspec.PathSpec]]] = {}
+_GITIGNORE_CHECK_INTERVAL = 1.0
+
+# Fenced code blocks for extract_code_blocks
+_CODE_BLOCK = re.compile(r'```(\w+)?\n(.*?)\n```', re.DOTALL)
+
+# now_iso reuses the formatted timestamp for this long
+_NOW_ISO_TTL = 0.05
+_now_iso: Tuple[float, str] = (0.0, '')
+
+
+def now_iso() -> str:
+    """Current local time in ISO format, reformatted at most every _NOW_ISO_TTL seconds."""
+    global _now_iso
+    now = time.time()
+    if not 0 <= now - _now_iso[0] < _NOW_ISO_TTL:
+        _now_iso = (now, datetime.fromtimestamp(now).isoformat())
+    return _now_iso[1]
 
 
 def get_file_hash(file_path: Path) -> str:
-    """Get SHA256 hash of a file."""
-    hash_sha256 = hashlib.sha256()
+    """Get BLAKE3 hash of a file."""
     try:
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_sha256.update(chunk)
-        return hash_sha256.hexdigest()
+            if os.fstat(f.fileno()).st_size < _MMAP_HASH_THRESHOLD:
+                return blake3(f.read()).hexdigest()
+            
+            # Hash large files straight from a memory mapping, multithreaded
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, 'madvise'):
+                    # Let the kernel read ahead of the hasher
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                return blake3(mm, max_threads=blake3.AUTO).hexdigest()
     except Exception:
         return ""
 
@@ -25,28 +123,25 @@ def get_file_hash(file_path: Path) -> str:
 def is_text_file(file_path: Path) -> bool:
     """Check if a file is likely a text file."""
     try:
-        mimetype, _ = mimetypes.guess_type(str(file_path))
-        if mimetype and mimetype.startswith('text/'):
+        # Common text file extensions first, without a mimetypes lookup
+        if file_path.suffix.lower() in TEXT_EXTENSIONS:
             return True
         
-        # Check common text file extensions
-        text_extensions = {
-            '.py', '.js', '.ts', '.jsx', '.tsx', '.html', '.css', '.scss', '.sass',
-            '.json', '.xml', '.yaml', '.yml', '.toml', '.ini', '.cfg', '.conf',
-            '.md', '.txt', '.rst', '.tex', '.log', '.sql', '.sh', '.bat', '.ps1',
-            '.java', '.c', '.cpp', '.h', '.hpp', '.cs', '.php', '.rb', '.go', '.rs',
-            '.swift', '.kt', '.scala', '.r', '.m', '.pl', '.lua', '.vim', '.dockerfile'
-        }
-        
-        return file_path.suffix.lower() in text_extensions
+        mimetype, _ = mimetypes.guess_type(str(file_path))
+        return bool(mimetype and mimetype.startswith('text/'))
     except Exception:
         return False
 
 
-def get_file_info(file_path: Path) -> Dict[str, Any]:
-    """Get comprehensive file information."""
+def get_file_info(file_path: Path, stat: Optional[os.stat_result] = None) -> Dict[str, Any]:
+    """Get comprehensive file information.
+    
+    Pass stat when it is already known, e.g. from a cached DirEntry.stat(),
+    to skip the stat syscall.
+    """
     try:
-        stat = file_path.stat()
+        if stat is None:
+            stat = file_path.stat()
         return {
             'path': str(file_path),
             'name': file_path.name,
@@ -63,10 +158,8 @@ def get_file_info(file_path: Path) -> Dict[str, Any]:
 
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename for safe file operations."""
-    # Remove or replace invalid characters
-    sanitized = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    # Remove control characters
-    sanitized = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', sanitized)
+    # Replace invalid characters and remove control characters in one pass
+    sanitized = filename.translate(_SANITIZE_TABLE)
     # Trim whitespace and dots
     sanitized = sanitized.strip('. ')
     # Ensure it's not empty
@@ -82,8 +175,7 @@ def truncate_text(text: str, max_length: int = 1000, suffix: str = "...") -> str
 
 def extract_code_blocks(text: str) -> List[Dict[str, str]]:
     """Extract code blocks from markdown text."""
-    pattern = r'```(\w+)?\n(.*?)\n```'
-    matches = re.findall(pattern, text, re.DOTALL)
+    matches = _CODE_BLOCK.findall(text)
     
     blocks = []
     for lang, code in matches:
@@ -120,37 +212,114 @@ def get_relative_path(file_path: Path, base_path: Path) -> str:
 def safe_read_file(file_path: Path, max_size: int = 1024 * 1024) -> Optional[str]:
     """Safely read file content with size limit."""
     try:
-        if file_path.stat().st_size > max_size:
-            return None
+        with open(file_path, 'rb') as f:
+            # Size check on the open file, then one read and one decode
+            size = os.fstat(f.fileno()).st_size
+            if size > max_size:
+                return None
+            data = f.read(size + 1)
         
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            return f.read()
+        if len(data) > max_size:
+            return None
+        # A NUL byte near the start means a binary file, as git assumes
+        if b'\0' in data[:8192]:
+            return None
+        return data.decode('utf-8', errors='ignore')
     except Exception:
         return None
 
 
+@lru_cache(maxsize=256)
+def _compile_glob(pattern: str) -> Pattern:
+    """Compile a glob pattern for a single path component."""
+    return re.compile(fnmatch.translate(pattern))
+
+
+def _iter_glob(directory: str, parts: Tuple[str, ...]) -> Iterator[os.DirEntry]:
+    """Yield entries of files below directory matching glob components."""
+    part, rest = parts[0], parts[1:]
+    
+    if part == '**':
+        if not rest:
+            return
+        # '**' matches zero or more directories
+        yield from _iter_glob(directory, rest)
+        for subdir in _iter_dirs(directory):
+            yield from _iter_glob(subdir, rest)
+        return
+    
+    part_re = _compile_glob(part)
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not part_re.match(entry.name):
+                    continue
+                if rest:
+                    if entry.is_dir():
+                        yield from _iter_glob(entry.path, rest)
+                elif entry.is_file():
+                    yield entry
+    except OSError:
+        return
+
+
+def _iter_dirs(directory: str) -> Iterator[str]:
+    """Recursively yield all directories below a directory."""
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        yield entry.path
+        except OSError:
+            continue
+
+
+def _compile_excludes(exclude_patterns: List[str]) -> Tuple[Optional[Pattern], List[str]]:
+    """Split exclude patterns into one name regex and a list of path patterns."""
+    name_patterns = [p for p in exclude_patterns if p and '/' not in p]
+    path_patterns = [p for p in exclude_patterns if p and '/' in p]
+    name_re = re.compile('|'.join(fnmatch.translate(p) for p in name_patterns)) if name_patterns else None
+    return name_re, path_patterns
+
+
+def iter_file_entries(base_path: Path, pattern: str) -> Iterator[os.DirEntry]:
+    """Yield entries of files below base_path matching a glob pattern.
+    
+    Entries cache their stat() result, so it can be passed on to
+    get_file_info instead of stat-ing each file again.
+    """
+    parts = tuple(part for part in pattern.split('/') if part and part != '.')
+    if parts and not os.path.isabs(pattern):
+        yield from _iter_glob(str(base_path), parts)
+
+
 def find_files_by_pattern(base_path: Path, patterns: List[str], 
                          exclude_patterns: List[str] = None) -> List[Path]:
     """Find files matching patterns."""
     if exclude_patterns is None:
         exclude_patterns = []
     
-    files = []
+    # Patterns without a slash match the file name, like Path.match does
+    name_re, path_patterns = _compile_excludes(exclude_patterns)
+    
+    files = set()
     
     for pattern in patterns:
-        for file_path in base_path.glob(pattern):
-            if file_path.is_file():
-                # Check exclude patterns
-                excluded = False
-                for exclude_pattern in exclude_patterns:
-                    if file_path.match(exclude_pattern):
-                        excluded = True
-                        break
-                
-                if not excluded:
-                    files.append(file_path)
+        for entry in iter_file_entries(base_path, pattern):
+            if name_re is not None and name_re.match(entry.name):
+                continue
+            
+            file_path = Path(entry.path)
+            if any(file_path.match(exclude_pattern) for exclude_pattern in path_patterns):
+                continue
+            
+            files.add(file_path)
     
-    return sorted(list(set(files)))
+    return sorted(files)
 
 
 def parse_gitignore(base_path: Path) -> List[str]:
@@ -172,68 +341,137 @@ def parse_gitignore(base_path: Path) -> List[str]:
     return patterns
 
 
-def is_git_ignored(file_path: Path, base_path: Path) -> bool:
-    """Check if file is ignored by git."""
+def gitignore_spec(base_path: Path) -> Optional[pathspec.PathSpec]:
+    """Get the compiled .gitignore and .git/info/exclude rules of a project.
+    
+    The spec is shared by every caller and rebuilt when either file changes;
+    the same object is returned for as long as the rules are unchanged.
+    """
+    key = str(base_path)
+    now = time.monotonic()
+    cached = _GITIGNORE_CACHE.get(key)
+    if cached is not None and now - cached[0] < _GITIGNORE_CHECK_INTERVAL:
+        return cached[2]
+    
+    sources = [base_path / '.gitignore', base_path / '.git' / 'info' / 'exclude']
+    mtimes = []
+    for source in sources:
+        try:
+            mtimes.append(source.stat().st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    
+    if cached is not None and cached[1] == mtimes:
+        _GITIGNORE_CACHE[key] = (now, mtimes, cached[2])
+        return cached[2]
+    
+    lines = parse_gitignore(base_path)
+    if mtimes[1] is not None:
+        try:
+            lines.extend(sources[1].read_text(encoding='utf-8').splitlines())
+        except Exception:
+            pass
+    
+    spec = pathspec.PathSpec.from_lines('gitwildmatch', lines) if lines else None
+    _GITIGNORE_CACHE[key] = (now, mtimes, spec)
+    return spec
+
+
+def is_git_ignored(file_path: Path, base_path: Path, is_dir: Optional[bool] = None) -> bool:
+    """Check if file is ignored by git.
+    
+    Matches the project's .gitignore and .git/info/exclude in-process,
+    instead of running git check-ignore per path. Pass is_dir when it is
+    already known to skip checking the path on disk.
+    """
     try:
-        import subprocess
-        result = subprocess.run(
-            ['git', 'check-ignore', str(file_path)],
-            cwd=base_path,
-            capture_output=True,
-            text=True
-        )
-        return result.returncode == 0
+        spec = gitignore_spec(base_path)
+        if spec is None:
+            return False
+        
+        rel_path = os.path.relpath(base_path / file_path, base_path).replace(os.sep, '/')
+        if rel_path == '.' or rel_path.startswith('../'):
+            return False
+        
+        if spec.match_file(rel_path):
+            return True
+        if is_dir is None:
+            is_dir = (base_path / file_path).is_dir()
+        return is_dir and spec.match_file(rel_path + '/')
     except Exception:
         return False
 
 
-def get_project_languages(base_path: Path) -> Dict[str, int]:
-    """Get language statistics for the project."""
-    language_extensions = {
-        'Python': ['.py'],
-        'JavaScript': ['.js'],
-        'TypeScript': ['.ts'],
-        'React': ['.jsx'],
-        'React TypeScript': ['.tsx'],
-        'HTML': ['.html', '.htm'],
-        'CSS': ['.css'],
-        'SCSS': ['.scss'],
-        'Java': ['.java'],
-        'C': ['.c'],
-        'C++': ['.cpp', '.cxx', '.cc'],
-        'C#': ['.cs'],
-        'Go': ['.go'],
-        'Rust': ['.rs'],
-        'PHP': ['.php'],
-        'Ruby': ['.rb'],
-        'Swift': ['.swift'],
-        'Kotlin': ['.kt'],
-        'Scala': ['.scala'],
-        'R': ['.r'],
-        'Shell': ['.sh', '.bash', '.zsh'],
-        'PowerShell': ['.ps1'],
-        'Docker': ['.dockerfile', 'Dockerfile'],
-        'SQL': ['.sql'],
-        'Markdown': ['.md'],
-        'YAML': ['.yaml', '.yml'],
-        'JSON': ['.json'],
-        'XML': ['.xml'],
-        'TOML': ['.toml'],
-        'INI': ['.ini', '.cfg', '.conf'],
-    }
-    
-    language_counts = {lang: 0 for lang in language_extensions}
+def _language_of(name: str) -> Optional[str]:
+    """Get the language of a file from its name."""
+    return _EXT_TO_LANG.get(os.path.splitext(name)[1].lower()) or _EXT_TO_LANG.get(name.lower())
+
+
+def _iter_file_names(directory: str) -> Iterator[str]:
+    """Recursively yield the names of all files below a directory."""
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry.name
+        except OSError:
+            continue
+
+
+def _count_languages(directory: str) -> Counter:
+    """Count files per language below a directory."""
+    counts = Counter()
+    for name in _iter_file_names(directory):
+        lang = _language_of(name)
+        if lang:
+            counts[lang] += 1
+    return counts
+
+
+def _count_languages_parallel(base_path: str) -> Counter:
+    """Count files per language, walking top-level directories in parallel."""
+    counts = Counter()
+    subdirs = []
+    with os.scandir(base_path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.is_file():
+                lang = _language_of(entry.name)
+                if lang:
+                    counts[lang] += 1
+    
+    if subdirs:
+        # Directory reads release the GIL, so threads overlap the syscalls
+        for subdir_counts in _WALK_POOL.map(_count_languages, subdirs):
+            counts.update(subdir_counts)
+    return counts
+
+
+def get_project_languages(base_path: Path, files: Optional[Iterable[Path]] = None) -> Dict[str, int]:
+    """Get language statistics for the project.
+    
+    If files is given, it is used instead of walking base_path, so callers
+    that already scanned the tree can share the result.
+    """
+    language_counts = Counter()
     
     try:
-        for file_path in base_path.rglob('*'):
-            if file_path.is_file() and is_text_file(file_path):
-                ext = file_path.suffix.lower()
-                for lang, extensions in language_extensions.items():
-                    if ext in extensions:
-                        language_counts[lang] += 1
-                        break
+        if files is None:
+            language_counts = _count_languages_parallel(str(base_path))
+        else:
+            # Every mapped extension is a text type, so no separate text check is needed
+            for file_path in files:
+                lang = _language_of(file_path.name)
+                if lang:
+                    language_counts[lang] += 1
     except Exception:
         pass
     
-    # Remove languages with zero counts
-    return {lang: count for lang, count in language_counts.items() if count > 0}
\ No newline at end of file
+    # Keep the declaration order, without languages with zero counts
+    return {lang: language_counts[lang] for lang in _LANGUAGE_EXTENSIONS if language_counts[lang]}
\ No newline at end of file
@@ -1,9 +1,11 @@
 """
 Authentication utilities for the ZombieCursor server.
 """
+import hmac
+import heapq
 import hashlib
 import secrets
-from datetime import datetime, timedelta
+import time
 from typing import Optional, Dict, Any
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -16,20 +18,34 @@ class AuthManager:
     
     def __init__(self):
         self.secret_key = settings.secret_key
+        # Keyed HMAC state, copied per token so the key is only expanded once
+        self._mac = hmac.new(self.secret_key.encode(), digestmod=hashlib.sha256)
         self.tokens = {}  # In-memory token storage (use Redis in production)
         self.api_keys = {}  # In-memory API key storage
         
+        # Min-heap of (expiry timestamp, token), so expired tokens are found
+        # without scanning every token
+        self._expiry_heap = []
+        
     def generate_token(self, user_id: str, expires_in: int = 3600) -> str:
         """Generate a JWT-like token."""
-        expiry = datetime.now() + timedelta(seconds=expires_in)
-        token_data = f"{user_id}:{expiry.timestamp()}:{secrets.token_hex(16)}"
-        token = hashlib.sha256(f"{token_data}:{self.secret_key}".encode()).hexdigest()
+        now = time.time()
+        expiry = now + expires_in
+        mac = self._mac.copy()
+        mac.update(user_id.encode())
+        mac.update(b":%f:" % expiry)
+        mac.update(secrets.token_bytes(16))
+        token = mac.hexdigest()
         
         self.tokens[token] = {
             "user_id": user_id,
             "expires_at": expiry,
-            "created_at": datetime.now()
+            "created_at": now
         }
+        heapq.heappush(self._expiry_heap, (expiry, token))
+        
+        # Sweep as tokens are issued, so memory stays bounded without a timer
+        self._expire_tokens()
         
         return token
     
@@ -41,7 +57,7 @@ class AuthManager:
         token_info = self.tokens[token]
         
         # Check if token has expired
-        if datetime.now() > token_info["expires_at"]:
+        if time.time() > token_info["expires_at"]:
             del self.tokens[token]
             return None
         
@@ -64,7 +80,7 @@ class AuthManager:
         self.api_keys[api_key] = {
             "name": name,
             "permissions": permissions,
-            "created_at": datetime.now(),
+            "created_at": time.time(),
             "last_used": None
         }
         
@@ -76,23 +92,30 @@ class AuthManager:
             return None
         
         key_info = self.api_keys[api_key]
-        key_info["last_used"] = datetime.now()
+        key_info["last_used"] = time.time()
         
         return key_info
     
+    def _expire_tokens(self) -> int:
+        """Remove expired tokens, popping them off the expiry heap."""
+        now = time.time()
+        heap = self._expiry_heap
+        removed = 0
+        
+        while heap and heap[0][0] < now:
+            _, token = heapq.heappop(heap)
+            # Skip entries for tokens that were revoked or already removed
+            if self.tokens.pop(token, None) is not None:
+                removed += 1
+        
+        return removed
+    
     def cleanup_expired_tokens(self):
         """Clean up expired tokens."""
-        current_time = datetime.now()
-        expired_tokens = [
-            token for token, info in self.tokens.items()
-            if current_time > info["expires_at"]
-        ]
-        
-        for token in expired_tokens:
-            del self.tokens[token]
+        removed = self._expire_tokens()
         
-        if expired_tokens:
-            log.info(f"Cleaned up {len(expired_tokens)} expired tokens")
+        if removed:
+            log.info(f"Cleaned up {removed} expired tokens")
 
 
 # Global auth manager
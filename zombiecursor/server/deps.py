@@ -0,0 +1,10 @@
+"""
+Shared agent instances for the ZombieCursor server.
+"""
+from agents.coder.agent import CoderAgent
+
+
+# Agents, created once and shared by the HTTP and WebSocket routes
+agents = {
+    "coder": CoderAgent()
+}
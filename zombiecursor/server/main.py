@@ -1,15 +1,29 @@
 """
 Main FastAPI server for ZombieCursor Local AI.
 """
+import asyncio
+import orjson
+from typing import Any
 from fastapi import FastAPI, HTTPException
+from starlette.responses import JSONResponse
 from contextlib import asynccontextmanager
 from core.config import settings
 from core.logging_config import log
 from server.routes_agent import router as agent_router
-from server.routes_status import router as status_router
+from server.routes_status import router as status_router, sample_system_usage
 from server.ws import router as ws_router
 from server.middleware import setup_cors, setup_security_middleware
 from server.auth import init_default_auth
+from core.llm import close_client
+from core.memory import memory_store
+from server.deps import agents
+
+
+class ZombieJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, accepting non-string dict keys like the stdlib encoder."""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
 
 
 @asynccontextmanager
@@ -25,10 +39,17 @@ async def lifespan(app: FastAPI):
     auth_info = init_default_auth()
     log.info(f"Authentication initialized - API Key: {auth_info['default_api_key'][:8]}...")
     
+    # Sample CPU and disk usage in the background for the status endpoint
+    usage_sampler = asyncio.create_task(sample_system_usage())
+    
     yield
     
     # Shutdown
     log.info("Shutting down ZombieCursor Local AI Server...")
+    usage_sampler.cancel()
+    await agents["coder"].drain()
+    await close_client()
+    memory_store.close()
 
 
 # Create FastAPI app
@@ -36,7 +57,8 @@ app = FastAPI(
     title="ZombieCursor Local AI",
     description="যেখানে কোড ও কথা বলে - Local AI-powered coding assistant",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ZombieJSONResponse
 )
 
 # Setup security and CORS middleware
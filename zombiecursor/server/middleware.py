@@ -1,202 +1,312 @@
 """
 Enhanced CORS and security middleware for ZombieCursor.
 """
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+from urllib.parse import parse_qsl
 import time
+import bisect
+import hashlib
 import ipaddress
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Tuple, Union, Callable
 from core.config import settings
 from core.logging_config import log
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Rate limiting middleware."""
+# Raw (lowercase) ASGI header names consulted for the client IP
+_X_FORWARDED_FOR = b"x-forwarded-for"
+_X_REAL_IP = b"x-real-ip"
+_X_API_KEY = b"x-api-key"
+
+# Security headers added to every response, pre-encoded for ASGI
+_SECURITY_HEADERS = (
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (
+        b"content-security-policy",
+        b"default-src 'self'; "
+        b"script-src 'self' 'unsafe-inline' 'unsafe-eval'; "
+        b"style-src 'self' 'unsafe-inline'; "
+        b"img-src 'self' data: https:; "
+        b"font-src 'self' data:; "
+        b"connect-src 'self' ws: wss:;"
+    ),
+)
+
+# A pre-built JSON error response: (status, headers, body)
+Rejection = Tuple[int, Tuple[Tuple[bytes, bytes], ...], bytes]
+
+
+def _rejection(status_code: int, body: bytes) -> Rejection:
+    """Pre-build a JSON error response."""
+    headers = (
+        (b"content-type", b"application/json"),
+        (b"content-length", b"%d" % len(body))
+    )
+    return status_code, headers, body
+
+
+_ACCESS_DENIED = _rejection(403, b'{"detail":"Access denied"}')
+_RATE_LIMITED = _rejection(429, b'{"detail":"Rate limit exceeded"}')
+_INVALID_API_KEY = _rejection(401, b'{"detail":"Invalid or missing API key"}')
+
+# Endpoints reachable without an API key
+_API_KEY_SKIP_PATHS = frozenset(["/", "/health", "/docs", "/openapi.json", "/status/server"])
+
+# Rate-limit buckets are split over this many shards (a power of two); a
+# shard's idle buckets are swept once it tracks this many clients
+_RATE_LIMIT_SHARDS = 16
+_RATE_LIMIT_SWEEP_THRESHOLD = 10000 // _RATE_LIMIT_SHARDS
+
+
+def get_client_ip(scope: Scope) -> str:
+    """Get client IP address from a raw ASGI scope.
     
-    def __init__(self, app: ASGIApp, calls: int = 100, period: int = 60):
-        super().__init__(app)
-        self.calls = calls
-        self.period = period
-        self.clients = {}
+    X-Forwarded-For wins over X-Real-IP, which wins over the peer address;
+    the headers are walked once without building a Headers object.
+    """
+    real_ip = None
+    for name, value in scope.get("headers", ()):
+        if name == _X_FORWARDED_FOR:
+            if value:
+                return value.split(b",", 1)[0].strip().decode("latin-1")
+        elif name == _X_REAL_IP and real_ip is None:
+            real_ip = value
     
-    async def dispatch(self, request: Request, call_next):
-        # Get client IP
-        client_ip = self._get_client_ip(request)
-        
-        # Check rate limit
-        if self._is_rate_limited(client_ip):
-            return JSONResponse(
-                status_code=429,
-                content={"detail": "Rate limit exceeded"}
-            )
-        
-        # Process request
-        response = await call_next(request)
-        return response
+    if real_ip:
+        return real_ip.decode("latin-1")
     
-    def _get_client_ip(self, request: Request) -> str:
-        """Get client IP address."""
-        # Check for forwarded IP
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-        
-        # Check for real IP
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
-        
-        # Use client host
-        return request.client.host if request.client else "unknown"
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def hash_api_key(api_key: str) -> bytes:
+    """Digest of an API key, so keys are only ever compared as digests.
     
-    def _is_rate_limited(self, client_ip: str) -> bool:
-        """Check if client is rate limited."""
-        current_time = time.time()
-        
-        # Clean old entries
-        cutoff_time = current_time - self.period
-        self.clients = {
-            ip: times for ip, times in self.clients.items()
-            if any(t > cutoff_time for t in times)
-        }
-        
-        # Check current client
-        if client_ip not in self.clients:
-            self.clients[client_ip] = []
-        
-        # Remove old calls for this client
-        self.clients[client_ip] = [
-            t for t in self.clients[client_ip] if t > cutoff_time
-        ]
-        
-        # Check if limit exceeded
-        if len(self.clients[client_ip]) >= self.calls:
-            return True
-        
-        # Add current call
-        self.clients[client_ip].append(current_time)
-        return False
+    Comparing digests of the presented key rather than the raw strings
+    means match timing says nothing about how close a guess was.
+    """
+    return hashlib.blake2b(api_key.encode("utf-8"), digest_size=16).digest()
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Security headers middleware."""
+def rate_limit_key(scope: Scope) -> Union[str, bytes]:
+    """Bucket key for rate limiting: the API key digest once authenticated, else the client IP.
     
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Content-Security-Policy"] = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline' 'unsafe-eval'; "
-            "style-src 'self' 'unsafe-inline'; "
-            "img-src 'self' data: https:; "
-            "font-src 'self' data:; "
-            "connect-src 'self' ws: wss:;"
-        )
-        
-        return response
+    Clients with their own API keys behind one NAT address then get a
+    bucket each instead of sharing the address's.
+    """
+    state = scope.get("state")
+    if state:
+        api_key_hash = state.get("api_key_hash")
+        if api_key_hash is not None:
+            return api_key_hash
+    return get_client_ip(scope)
+
 
+async def send_rejection(send: Send, rejection: Rejection) -> None:
+    """Send a pre-built JSON error response."""
+    status_code, headers, body = rejection
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        # Fresh list, outer layers may append to it
+        "headers": list(headers)
+    })
+    await send({"type": "http.response.body", "body": body})
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Request logging middleware."""
+
+def get_api_key(scope: Scope) -> Optional[str]:
+    """Get the API key from the X-API-Key header or the api_key query parameter."""
+    for name, value in scope.get("headers", ()):
+        if name == _X_API_KEY and value:
+            return value.decode("latin-1")
     
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
-        # Log request
-        log.info(f"Request: {request.method} {request.url}")
-        
-        # Process request
-        response = await call_next(request)
+    query_string = scope.get("query_string")
+    if query_string:
+        for key, value in parse_qsl(query_string.decode("latin-1"), keep_blank_values=True):
+            if key == "api_key":
+                return value
+    return None
+
+
+class RateLimiter:
+    """Token bucket per client, keyed by IP or API key digest.
+    
+    Each bucket holds up to `calls` tokens and refills at `calls` per
+    `period`, so a client gets bursts of `calls` and that rate sustained.
+    """
+    
+    __slots__ = ("calls", "period", "rate", "_shards")
+    
+    def __init__(self, calls: int = 100, period: int = 60):
+        self.calls = calls
+        self.period = period
+        self.rate = calls / period
+        # Shards of client key -> (tokens, last refill time), so a sweep only
+        # walks a fraction of the clients
+        self._shards: List[Dict[Union[str, bytes], Tuple[float, float]]] = [
+            {} for _ in range(_RATE_LIMIT_SHARDS)
+        ]
+    
+    def is_rate_limited(self, client_key: Union[str, bytes]) -> bool:
+        """Check if client is rate limited, consuming a token if not.
         
-        # Calculate duration
-        process_time = time.time() - start_time
+        Refill and consume run without awaiting in between, so on the event
+        loop each update is atomic and needs no lock.
+        """
+        current_time = time.monotonic()
+        clients = self._shards[hash(client_key) & (_RATE_LIMIT_SHARDS - 1)]
         
-        # Log response
-        log.info(
-            f"Response: {response.status_code} - "
-            f"{request.method} {request.url} - "
-            f"{process_time:.4f}s"
-        )
+        bucket = clients.get(client_key)
+        if bucket is None:
+            if len(clients) >= _RATE_LIMIT_SWEEP_THRESHOLD:
+                self._sweep(clients, current_time)
+            tokens = self.calls
+        else:
+            tokens, last_refill = bucket
+            tokens += (current_time - last_refill) * self.rate
+            if tokens > self.calls:
+                tokens = self.calls
         
-        # Add processing time header
-        response.headers["X-Process-Time"] = str(process_time)
+        if tokens < 1:
+            clients[client_key] = (tokens, current_time)
+            return True
         
-        return response
+        clients[client_key] = (tokens - 1, current_time)
+        return False
+    
+    def _sweep(self, clients: Dict[Union[str, bytes], Tuple[float, float]], current_time: float) -> None:
+        """Drop a shard's buckets idle long enough to have refilled completely."""
+        cutoff_time = current_time - self.period
+        for key in [key for key, (_, last_refill) in clients.items() if last_refill < cutoff_time]:
+            del clients[key]
 
 
-class IPWhitelistMiddleware(BaseHTTPMiddleware):
-    """IP whitelist middleware for enhanced security."""
+class IPAllowlist:
+    """Allowed IP addresses and networks, looked up by bisect."""
     
-    def __init__(self, app: ASGIApp, allowed_ips: List[str] = None):
-        super().__init__(app)
+    def __init__(self, allowed_ips: List[str] = None):
         self.allowed_ips = allowed_ips or []
-        self.allowed_networks = []
         
-        # Parse IP addresses and networks
+        # Parse IP addresses and networks, single IPs become /32 or /128 networks
+        networks = {4: [], 6: []}
         for ip in self.allowed_ips:
             try:
-                if '/' in ip:
-                    # Network CIDR notation
-                    self.allowed_networks.append(ipaddress.ip_network(ip, strict=False))
-                else:
-                    # Single IP address
-                    self.allowed_networks.append(ipaddress.ip_address(ip))
+                network = ipaddress.ip_network(ip, strict=False)
+                networks[network.version].append(network)
             except ValueError:
                 log.warning(f"Invalid IP address/network: {ip}")
-    
-    async def dispatch(self, request: Request, call_next):
-        if not self.allowed_networks:
-            # No IP restrictions
-            return await call_next(request)
-        
-        client_ip = self._get_client_ip(request)
         
+        # Per IP version, sorted non-overlapping (first, last) address ranges
+        # as integers, searched with bisect
+        self._range_starts: Dict[int, List[int]] = {}
+        self._range_ends: Dict[int, List[int]] = {}
+        for version, version_networks in networks.items():
+            collapsed = list(ipaddress.collapse_addresses(version_networks))
+            self._range_starts[version] = [int(network.network_address) for network in collapsed]
+            self._range_ends[version] = [int(network.broadcast_address) for network in collapsed]
+    
+    def __bool__(self) -> bool:
+        return any(self._range_starts.values())
+    
+    def is_allowed(self, client_ip: str) -> bool:
+        """Check if an address falls in one of the allowed ranges."""
         try:
             client_ip_obj = ipaddress.ip_address(client_ip)
-            
-            # Check if IP is allowed
-            is_allowed = any(
-                client_ip_obj in network if isinstance(network, ipaddress.IPv4Network) or isinstance(network, ipaddress.IPv6Network)
-                else client_ip_obj == network
-                for network in self.allowed_networks
-            )
-            
-            if not is_allowed:
-                log.warning(f"Access denied for IP: {client_ip}")
-                return JSONResponse(
-                    status_code=403,
-                    content={"detail": "Access denied"}
-                )
-            
         except ValueError:
             log.warning(f"Invalid client IP: {client_ip}")
-            return JSONResponse(
-                status_code=403,
-                content={"detail": "Access denied"}
-            )
+            return False
+        
+        address = int(client_ip_obj)
+        starts = self._range_starts[client_ip_obj.version]
+        index = bisect.bisect_right(starts, address) - 1
+        if index >= 0 and address <= self._range_ends[client_ip_obj.version][index]:
+            return True
+        
+        log.warning(f"Access denied for IP: {client_ip}")
+        return False
+
+
+class ZombieSecurityMiddleware:
+    """All security middleware as a single pure ASGI layer.
+    
+    Checks the IP allowlist, rate limit and API key, logs the request and
+    adds the security and X-Process-Time headers in one pass, instead of
+    one ASGI layer per concern.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        rate_limit_calls: Optional[int] = None,
+        rate_limit_period: int = 60,
+        allowed_ips: List[str] = None,
+        api_keys: List[str] = None,
+        key_fn: Optional[Callable[[Scope], Union[str, bytes]]] = None
+    ):
+        self.app = app
+        self.limiter = RateLimiter(rate_limit_calls, rate_limit_period) if rate_limit_calls else None
+        self.allowlist = IPAllowlist(allowed_ips)
+        self.api_key_hashes = frozenset(hash_api_key(key) for key in api_keys or [])
+        self.key_fn = key_fn or rate_limit_key
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        return await call_next(request)
+        start_time = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+        
+        # Log request, formatted only if the level is enabled
+        log.info("Request: {} {}", method, path)
+        
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                process_time = time.perf_counter() - start_time
+                
+                # Log response
+                log.info("Response: {} - {} {} - {:.4f}s", message["status"], method, path, process_time)
+                
+                # Add security and processing time headers
+                headers = list(message.get("headers", ()))
+                headers.extend(_SECURITY_HEADERS)
+                headers.append((b"x-process-time", b"%.4f" % process_time))
+                message["headers"] = headers
+            await send(message)
+        
+        rejection = self._check(scope)
+        if rejection is not None:
+            await send_rejection(send_with_headers, rejection)
+            return
+        
+        await self.app(scope, receive, send_with_headers)
     
-    def _get_client_ip(self, request: Request) -> str:
-        """Get client IP address."""
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
+    def _check(self, scope: Scope) -> Optional[Rejection]:
+        """Run the access checks, returning the rejection if one fails.
+        
+        The API key is checked before the rate limit, so authenticated
+        clients are limited per key rather than per IP.
+        """
+        if self.allowlist and not self.allowlist.is_allowed(get_client_ip(scope)):
+            return _ACCESS_DENIED
+        
+        if self.api_key_hashes and scope["path"] not in _API_KEY_SKIP_PATHS:
+            api_key = get_api_key(scope)
+            key_hash = hash_api_key(api_key) if api_key else None
+            if key_hash not in self.api_key_hashes:
+                return _INVALID_API_KEY
+            scope.setdefault("state", {})["api_key_hash"] = key_hash
         
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
+        if self.limiter is not None and self.limiter.is_rate_limited(self.key_fn(scope)):
+            return _RATE_LIMITED
         
-        return request.client.host if request.client else "unknown"
+        return None
 
 
 def setup_cors(app: FastAPI) -> None:
@@ -220,7 +330,8 @@ def setup_cors(app: FastAPI) -> None:
     )
 
 
-def setup_security_middleware(app: FastAPI) -> None:
+def setup_security_middleware(app: FastAPI, allowed_ips: List[str] = None,
+                              api_keys: List[str] = None) -> None:
     """Setup security middleware."""
     # Trusted host middleware
     if settings.host != "0.0.0.0":
@@ -229,51 +340,12 @@ def setup_security_middleware(app: FastAPI) -> None:
             allowed_hosts=[settings.host, "localhost", "127.0.0.1"]
         )
     
-    # Security headers
-    app.add_middleware(SecurityHeadersMiddleware)
-    
-    # Request logging
-    app.add_middleware(RequestLoggingMiddleware)
-    
-    # Rate limiting (more permissive for development)
-    if not settings.debug:
-        app.add_middleware(RateLimitMiddleware, calls=100, period=60)
-
-
-def setup_production_security(app: FastAPI, allowed_ips: List[str] = None) -> None:
-    """Setup production security with IP whitelist."""
-    if allowed_ips:
-        app.add_middleware(IPWhitelistMiddleware, allowed_ips=allowed_ips)
-
-
-class APIKeyMiddleware(BaseHTTPMiddleware):
-    """API key authentication middleware."""
-    
-    def __init__(self, app: ASGIApp, api_keys: List[str] = None):
-        super().__init__(app)
-        self.api_keys = set(api_keys or [])
-    
-    async def dispatch(self, request: Request, call_next):
-        # Skip API key check for certain endpoints
-        skip_paths = ["/", "/health", "/docs", "/openapi.json", "/status/server"]
-        if request.url.path in skip_paths:
-            return await call_next(request)
-        
-        # Check API key
-        api_key = request.headers.get("X-API-Key")
-        if not api_key:
-            api_key = request.query_params.get("api_key")
-        
-        if not api_key or api_key not in self.api_keys:
-            return JSONResponse(
-                status_code=401,
-                content={"detail": "Invalid or missing API key"}
-            )
-        
-        return await call_next(request)
-
-
-def setup_api_key_auth(app: FastAPI, api_keys: List[str] = None) -> None:
-    """Setup API key authentication."""
-    if api_keys:
-        app.add_middleware(APIKeyMiddleware, api_keys=api_keys)
\ No newline at end of file
+    # Security headers, request logging, rate limiting (more permissive for
+    # development) and the optional IP whitelist and API key checks, as one layer
+    app.add_middleware(
+        ZombieSecurityMiddleware,
+        rate_limit_calls=None if settings.debug else 100,
+        rate_limit_period=60,
+        allowed_ips=allowed_ips,
+        api_keys=api_keys
+    )
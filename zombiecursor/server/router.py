@@ -1,39 +1,45 @@
 """
 Router configuration for the ZombieCursor server.
 """
-from fastapi import APIRouter
+import orjson
+from fastapi import APIRouter, Response
 from typing import Dict, Any
 
 # Create main router
 router = APIRouter()
 
+# Static responses, serialized once at import
+_ROUTES_JSON = orjson.dumps({
+    "routes": {
+        "agent": "/agent",
+        "status": "/status", 
+        "websocket": "/ws",
+        "docs": "/docs",
+        "health": "/health"
+    }
+})
+
+_INFO_JSON = orjson.dumps({
+    "name": "ZombieCursor Local AI",
+    "version": "1.0.0",
+    "tagline": "যেখানে কোড ও কথা বলে",
+    "description": "Local AI-powered coding assistant with Cursor AI features",
+    "features": [
+        "Local LLM integration",
+        "Multiple specialized agents",
+        "Real-time WebSocket communication",
+        "Comprehensive tool integration",
+        "Project context awareness",
+        "Streaming responses"
+    ]
+})
+
 @router.get("/routes")
 async def get_routes():
     """Get all available routes."""
-    return {
-        "routes": {
-            "agent": "/agent",
-            "status": "/status", 
-            "websocket": "/ws",
-            "docs": "/docs",
-            "health": "/health"
-        }
-    }
+    return Response(content=_ROUTES_JSON, media_type="application/json")
 
 @router.get("/info")
 async def get_info():
     """Get server information."""
-    return {
-        "name": "ZombieCursor Local AI",
-        "version": "1.0.0",
-        "tagline": "যেখানে কোড ও কথা বলে",
-        "description": "Local AI-powered coding assistant with Cursor AI features",
-        "features": [
-            "Local LLM integration",
-            "Multiple specialized agents",
-            "Real-time WebSocket communication",
-            "Comprehensive tool integration",
-            "Project context awareness",
-            "Streaming responses"
-        ]
-    }
\ No newline at end of file
+    return Response(content=_INFO_JSON, media_type="application/json")
@@ -1,11 +1,12 @@
 """
 Agent routes for the ZombieCursor server.
 """
+import asyncio
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
-from core.interfaces import AgentType
-from agents.coder.agent import CoderAgent
+from core.interfaces import AgentType, AgentRequest as CoreAgentRequest
+from server.deps import agents
 from core.config import settings
 from core.logging_config import log
 
@@ -31,6 +32,12 @@ class AgentResponse(BaseModel):
     success: bool = True
 
 
+class BatchResponse(BaseModel):
+    """Response model for batch agent operations."""
+    results: List[AgentResponse]
+    total: int
+
+
 class ToolRequest(BaseModel):
     """Request model for tool operations."""
     tool_name: str
@@ -46,10 +53,16 @@ class ToolResponse(BaseModel):
     success: bool = True
 
 
-# Initialize agents
-agents = {
-    "coder": CoderAgent()
-}
+def _resolve_agent_type(agent_name: str) -> AgentType:
+    """Convert an agent name to its AgentType, defaulting to CODER."""
+    try:
+        return AgentType(agent_name)
+    except ValueError:
+        return AgentType.CODER
+
+
+# Agent types of the registered agents, resolved once
+_AGENT_TYPES = {name: _resolve_agent_type(name) for name in agents}
 
 
 @router.post("/{agent_name}/run", response_model=AgentResponse)
@@ -61,19 +74,10 @@ async def run_agent(agent_name: str, request: AgentRequest):
         
         agent = agents[agent_name]
         
-        # Convert string agent_type to enum
-        try:
-            agent_type = AgentType(agent_name)
-        except ValueError:
-            agent_type = AgentType.CODER  # Default to CODER
-        
         # Create agent request
-        agent_request = agent.__class__.__bases__[0].__module__.split('.')[0]  # Get the base class
-        from core.interfaces import AgentRequest as CoreAgentRequest
-        
         core_request = CoreAgentRequest(
             query=request.query,
-            agent_type=agent_type,
+            agent_type=_AGENT_TYPES[agent_name],
             context=request.context,
             stream=request.stream,
             metadata=request.metadata
@@ -209,26 +213,32 @@ async def list_agents():
     """List all available agents."""
     agents_info = {}
     
-    for name, agent in agents.items():
-        try:
-            capabilities = await agent.get_capabilities()
-            agents_info[name] = {
-                "name": name,
-                "description": capabilities.get("description", ""),
-                "capabilities": capabilities.get("capabilities", []),
-                "tools": capabilities.get("tools", [])
-            }
-        except Exception as e:
-            log.error(f"Error getting info for agent {name}: {str(e)}")
+    # Query all agents concurrently
+    all_capabilities = await asyncio.gather(
+        *(agent.get_capabilities() for agent in agents.values()),
+        return_exceptions=True
+    )
+    
+    for name, capabilities in zip(agents, all_capabilities):
+        if isinstance(capabilities, Exception):
+            log.error(f"Error getting info for agent {name}: {str(capabilities)}")
             agents_info[name] = {
                 "name": name,
-                "error": str(e)
+                "error": str(capabilities)
             }
+            continue
+        
+        agents_info[name] = {
+            "name": name,
+            "description": capabilities.get("description", ""),
+            "capabilities": capabilities.get("capabilities", []),
+            "tools": capabilities.get("tools", [])
+        }
     
     return {"agents": agents_info}
 
 
-@router.post("/{agent_name}/batch")
+@router.post("/{agent_name}/batch", response_model=BatchResponse)
 async def batch_operations(agent_name: str, requests: List[AgentRequest]):
     """Execute multiple agent requests in batch."""
     try:
@@ -236,26 +246,37 @@ async def batch_operations(agent_name: str, requests: List[AgentRequest]):
             raise HTTPException(status_code=404, detail=f"Agent '{agent_name}' not found")
         
         agent = agents[agent_name]
-        results = []
+        semaphore = asyncio.Semaphore(settings.max_batch_concurrency)
         
-        for request in requests:
-            try:
-                # Convert string agent_type to enum
-                agent_type = AgentType(agent_name)
-                
-                # Create agent request
-                from core.interfaces import AgentRequest as CoreAgentRequest
-                core_request = CoreAgentRequest(
-                    query=request.query,
-                    agent_type=agent_type,
-                    context=request.context,
-                    stream=request.stream,
-                    metadata=request.metadata
-                )
-                
-                # Run agent
-                response = await agent.run(core_request)
-                
+        async def _run_one(request: AgentRequest):
+            # Create agent request
+            core_request = CoreAgentRequest(
+                query=request.query,
+                agent_type=_AGENT_TYPES[agent_name],
+                context=request.context,
+                stream=request.stream,
+                metadata=request.metadata
+            )
+            
+            # Run agent, bounded so a large batch does not flood the LLM
+            async with semaphore:
+                return await agent.run(core_request)
+        
+        responses = await asyncio.gather(
+            *(_run_one(request) for request in requests),
+            return_exceptions=True
+        )
+        
+        results = []
+        for response in responses:
+            if isinstance(response, Exception):
+                results.append(AgentResponse(
+                    agent_type=agent_name,
+                    content="",
+                    error=str(response),
+                    success=False
+                ))
+            else:
                 results.append(AgentResponse(
                     agent_type=agent_name,
                     content=response.content,
@@ -263,16 +284,8 @@ async def batch_operations(agent_name: str, requests: List[AgentRequest]):
                     error=response.error,
                     success=response.error is None
                 ))
-                
-            except Exception as e:
-                results.append(AgentResponse(
-                    agent_type=agent_name,
-                    content="",
-                    error=str(e),
-                    success=False
-                ))
         
-        return {"results": results, "total": len(results)}
+        return BatchResponse(results=results, total=len(results))
         
     except Exception as e:
         log.error(f"Error in batch operations for agent {agent_name}: {str(e)}")
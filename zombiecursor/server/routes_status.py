@@ -2,39 +2,107 @@
 Status routes for the ZombieCursor server.
 """
 from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+import time
+import asyncio
+import itertools
 import psutil
 import platform
 from datetime import datetime
+from pathlib import Path
 from core.config import settings
 from core.logging_config import log
-from core.llm import LocalLLM
+from server.deps import agents
+from core.utils import now_iso
 
 
 router = APIRouter()
 
+# Platform details do not change while the process runs
+_SYSTEM_INFO = {
+    "platform": platform.system(),
+    "platform_release": platform.release(),
+    "platform_version": platform.version(),
+    "architecture": platform.architecture(),
+    "hostname": platform.node(),
+    "processor": platform.processor(),
+    "python_version": platform.python_version()
+}
+
+# System CPU and disk usage are sampled in the background (disk every
+# _DISK_SAMPLE_EVERY CPU samples), so requests never make those syscalls
+_CPU_SAMPLE_INTERVAL = 2.0
+_DISK_SAMPLE_EVERY = 5
+_cpu_percent: Optional[float] = None
+_disk_usage = None
+
+# This server's process, kept so cpu_percent() measures since the last call
+_process = psutil.Process()
+
+
+# Status payloads are recomputed at most this often, so dashboards polling
+# the status endpoints do not each pay for psutil, LLM and tool calls
+_STATUS_TTL = 2.0
+_LLM_MODELS_TTL = 30.0
+
+# Cached status payloads (key -> (expires at, payload)) and in-flight refreshes
+_status_cache: Dict[str, Tuple[float, Any]] = {}
+_status_inflight: Dict[str, "asyncio.Task[Any]"] = {}
+
+
+async def _cached(key: str, ttl: float, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Get a payload computed at most once per ttl seconds.
+    
+    Concurrent misses share one computation; failures are not cached.
+    """
+    cached = _status_cache.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    
+    task = _status_inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _status_inflight[key] = task
+        
+        def _store(task: "asyncio.Task[Any]") -> None:
+            _status_inflight.pop(key, None)
+            if not task.cancelled() and task.exception() is None:
+                _status_cache[key] = (time.monotonic() + ttl, task.result())
+        
+        task.add_done_callback(_store)
+    
+    # Shield so one cancelled caller does not cancel the shared refresh
+    return await asyncio.shield(task)
+
+
+async def sample_system_usage() -> None:
+    """Refresh the system CPU and disk usage samples until cancelled."""
+    global _cpu_percent, _disk_usage
+    
+    # The first non-blocking call only sets the baseline
+    psutil.cpu_percent(interval=None)
+    for sample in itertools.count():
+        if sample % _DISK_SAMPLE_EVERY == 0:
+            _disk_usage = psutil.disk_usage('/')
+        await asyncio.sleep(_CPU_SAMPLE_INTERVAL)
+        _cpu_percent = psutil.cpu_percent(interval=None)
+
 
 @router.get("/server")
 async def get_server_status():
     """Get server status information."""
+    return await _cached("server", _STATUS_TTL, _get_server_status)
+
+
+async def _get_server_status():
+    """Collect server status information, uncached."""
     try:
-        # System information
-        system_info = {
-            "platform": platform.system(),
-            "platform_release": platform.release(),
-            "platform_version": platform.version(),
-            "architecture": platform.architecture(),
-            "hostname": platform.node(),
-            "processor": platform.processor(),
-            "python_version": platform.python_version()
-        }
-        
         # Resource usage
         memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        disk = _disk_usage if _disk_usage is not None else psutil.disk_usage('/')
         
         resource_info = {
-            "cpu_percent": psutil.cpu_percent(interval=1),
+            "cpu_percent": _cpu_percent if _cpu_percent is not None else psutil.cpu_percent(interval=None),
             "memory": {
                 "total": memory.total,
                 "available": memory.available,
@@ -51,27 +119,29 @@ async def get_server_status():
         }
         
         # Process information
-        process = psutil.Process()
-        process_info = {
-            "pid": process.pid,
-            "name": process.name(),
-            "status": process.status(),
-            "create_time": datetime.fromtimestamp(process.create_time()).isoformat(),
-            "cpu_percent": process.cpu_percent(),
-            "memory_info": process.memory_info()._asdict(),
-            "memory_percent": process.memory_percent(),
-            "num_threads": process.num_threads
-        }
+        process = _process
+        # Read each /proc file once for all the fields below
+        with process.oneshot():
+            process_info = {
+                "pid": process.pid,
+                "name": process.name(),
+                "status": process.status(),
+                "create_time": datetime.fromtimestamp(process.create_time()).isoformat(),
+                "cpu_percent": process.cpu_percent(interval=None),
+                "memory_info": process.memory_info()._asdict(),
+                "memory_percent": process.memory_percent(),
+                "num_threads": process.num_threads()
+            }
         
         return {
             "server": {
                 "name": "ZombieCursor Local AI",
                 "version": "1.0.0",
                 "tagline": "যেখানে কোড ও কথা বলে",
-                "uptime": datetime.now().isoformat(),
+                "uptime": now_iso(),
                 "debug": settings.debug
             },
-            "system": system_info,
+            "system": _SYSTEM_INFO,
             "resources": resource_info,
             "process": process_info,
             "configuration": {
@@ -94,14 +164,21 @@ async def get_server_status():
 @router.get("/llm")
 async def get_llm_status():
     """Get LLM status information."""
+    return await _cached("llm", _STATUS_TTL, _get_llm_status)
+
+
+async def _get_llm_status():
+    """Collect LLM status information, uncached."""
     try:
-        llm = LocalLLM()
-        
-        # Health check
-        is_healthy = await llm.health_check()
+        # Reuse the coder agent's provider instead of building one per request
+        llm = agents["coder"].llm
         
-        # List available models
-        models = await llm.list_models()
+        # Health check and available models, which change far less often
+        # than health, in one round-trip's time
+        is_healthy, models = await asyncio.gather(
+            llm.health_check(),
+            _cached("llm_models", _LLM_MODELS_TTL, llm.list_models)
+        )
         
         # Configuration
         config = {
@@ -136,14 +213,17 @@ async def get_llm_status():
 @router.get("/agents")
 async def get_agents_status():
     """Get status of all agents."""
+    return await _cached("agents", _STATUS_TTL, _get_agents_status)
+
+
+async def _get_agents_status():
+    """Collect status of all agents, uncached."""
     try:
-        from agents.coder.agent import CoderAgent
-        
         agents_status = {}
         
         # Check coder agent
         try:
-            coder_agent = CoderAgent()
+            coder_agent = agents["coder"]
             coder_health = await coder_agent.health_check()
             coder_capabilities = await coder_agent.get_capabilities()
             
@@ -172,23 +252,16 @@ async def get_agents_status():
 @router.get("/tools")
 async def get_tools_status():
     """Get status of all tools."""
+    return await _cached("tools", _STATUS_TTL, _get_tools_status)
+
+
+async def _get_tools_status():
+    """Collect status of all tools, uncached."""
     try:
-        from tools.fs_tool import FilesystemTool
-        from tools.python_tool import PythonTool
-        from tools.search_tool import SearchTool
-        from tools.git_tool import GitTool
-        from tools.system_tool import SystemTool
-        
         tools_status = {}
         
-        # Check each tool
-        tools = {
-            "filesystem": FilesystemTool(),
-            "python": PythonTool(),
-            "search": SearchTool(),
-            "git": GitTool(),
-            "system": SystemTool()
-        }
+        # Check each tool, using the coder agent's shared instances
+        tools = agents["coder"].tools
         
         for name, tool in tools.items():
             try:
@@ -296,43 +369,55 @@ async def health_check():
     try:
         health_status = {
             "overall": "healthy",
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now_iso(),
             "checks": {}
         }
         
+        # Run all checks concurrently
+        server_status, llm_status, agents_status, tools_status = await asyncio.gather(
+            get_server_status(),
+            get_llm_status(),
+            get_agents_status(),
+            get_tools_status(),
+            return_exceptions=True
+        )
+        
         # Check server
-        try:
-            server_status = await get_server_status()
+        if isinstance(server_status, Exception):
+            health_status["checks"]["server"] = {
+                "status": "unhealthy",
+                "error": str(server_status)
+            }
+            health_status["overall"] = "unhealthy"
+        else:
             health_status["checks"]["server"] = {
                 "status": "healthy",
                 "details": server_status
             }
-        except Exception as e:
-            health_status["checks"]["server"] = {
+        
+        # Check LLM
+        if isinstance(llm_status, Exception):
+            health_status["checks"]["llm"] = {
                 "status": "unhealthy",
-                "error": str(e)
+                "error": str(llm_status)
             }
             health_status["overall"] = "unhealthy"
-        
-        # Check LLM
-        try:
-            llm_status = await get_llm_status()
+        else:
             health_status["checks"]["llm"] = {
                 "status": "healthy" if llm_status["healthy"] else "unhealthy",
                 "details": llm_status
             }
             if not llm_status["healthy"]:
                 health_status["overall"] = "unhealthy"
-        except Exception as e:
-            health_status["checks"]["llm"] = {
+        
+        # Check agents
+        if isinstance(agents_status, Exception):
+            health_status["checks"]["agents"] = {
                 "status": "unhealthy",
-                "error": str(e)
+                "error": str(agents_status)
             }
             health_status["overall"] = "unhealthy"
-        
-        # Check agents
-        try:
-            agents_status = await get_agents_status()
+        else:
             all_healthy = all(agent.get("healthy", False) for agent in agents_status["agents"].values())
             health_status["checks"]["agents"] = {
                 "status": "healthy" if all_healthy else "unhealthy",
@@ -340,16 +425,15 @@ async def health_check():
             }
             if not all_healthy:
                 health_status["overall"] = "unhealthy"
-        except Exception as e:
-            health_status["checks"]["agents"] = {
+        
+        # Check tools
+        if isinstance(tools_status, Exception):
+            health_status["checks"]["tools"] = {
                 "status": "unhealthy",
-                "error": str(e)
+                "error": str(tools_status)
             }
             health_status["overall"] = "unhealthy"
-        
-        # Check tools
-        try:
-            tools_status = await get_tools_status()
+        else:
             all_healthy = all(tool.get("healthy", False) for tool in tools_status["tools"].values())
             health_status["checks"]["tools"] = {
                 "status": "healthy" if all_healthy else "unhealthy",
@@ -357,12 +441,6 @@ async def health_check():
             }
             if not all_healthy:
                 health_status["overall"] = "degraded"
-        except Exception as e:
-            health_status["checks"]["tools"] = {
-                "status": "unhealthy",
-                "error": str(e)
-            }
-            health_status["overall"] = "unhealthy"
         
         return health_status
         
@@ -2,47 +2,48 @@
 WebSocket routes for real-time communication.
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict, Any, List
-import json
+from typing import Dict, Any, Callable, Awaitable
+import orjson
 import asyncio
-from datetime import datetime
-from core.interfaces import AgentType
-from agents.coder.agent import CoderAgent
+from core.interfaces import AgentType, AgentRequest
+from server.deps import agents
+from core.utils import now_iso
 from core.logging_config import log
 
 
 router = APIRouter()
 
 
+def _dumps(message: Dict[str, Any]) -> str:
+    """Serialize a message for a text frame."""
+    return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+
 class ConnectionManager:
     """Manages WebSocket connections."""
     
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.connection_info: Dict[WebSocket, Dict[str, Any]] = {}
+        # Connection info keyed by socket, in connection order
+        self.active_connections: Dict[WebSocket, Dict[str, Any]] = {}
     
     async def connect(self, websocket: WebSocket, client_id: str = None):
         """Accept and register a WebSocket connection."""
         await websocket.accept()
-        self.active_connections.append(websocket)
         
-        self.connection_info[websocket] = {
-            "client_id": client_id or f"client_{len(self.active_connections)}",
-            "connected_at": datetime.now().isoformat(),
+        info = {
+            "client_id": client_id or f"client_{len(self.active_connections) + 1}",
+            "connected_at": now_iso(),
             "message_count": 0
         }
+        self.active_connections[websocket] = info
         
-        log.info(f"WebSocket connection established: {self.connection_info[websocket]['client_id']}")
+        log.info(f"WebSocket connection established: {info['client_id']}")
     
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection."""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        
-        if websocket in self.connection_info:
-            client_id = self.connection_info[websocket]["client_id"]
-            del self.connection_info[websocket]
-            log.info(f"WebSocket connection closed: {client_id}")
+        info = self.active_connections.pop(websocket, None)
+        if info is not None:
+            log.info(f"WebSocket connection closed: {info['client_id']}")
     
     async def send_personal_message(self, message: str, websocket: WebSocket):
         """Send a message to a specific WebSocket connection."""
@@ -50,26 +51,31 @@ class ConnectionManager:
             await websocket.send_text(message)
             
             # Update message count
-            if websocket in self.connection_info:
-                self.connection_info[websocket]["message_count"] += 1
+            info = self.active_connections.get(websocket)
+            if info is not None:
+                info["message_count"] += 1
                 
         except Exception as e:
             log.error(f"Error sending personal message: {str(e)}")
     
     async def broadcast(self, message: str):
         """Broadcast a message to all connected clients."""
-        disconnected = []
-        
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                log.error(f"Error broadcasting to client: {str(e)}")
-                disconnected.append(connection)
+        # Send to a snapshot concurrently, so one slow client does not hold up the rest
+        connections = list(self.active_connections)
+        results = await asyncio.gather(
+            *(connection.send_text(message) for connection in connections),
+            return_exceptions=True
+        )
         
         # Remove disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
+        disconnected = [
+            connection for connection, result in zip(connections, results)
+            if isinstance(result, Exception)
+        ]
+        if disconnected:
+            log.error(f"Error broadcasting to {len(disconnected)} client(s), disconnecting them")
+            for connection in disconnected:
+                self.disconnect(connection)
     
     def get_connection_info(self) -> Dict[str, Any]:
         """Get information about all connections."""
@@ -81,7 +87,7 @@ class ConnectionManager:
                     "connected_at": info["connected_at"],
                     "message_count": info["message_count"]
                 }
-                for info in self.connection_info.values()
+                for info in self.active_connections.values()
             ]
         }
 
@@ -107,10 +113,10 @@ async def websocket_endpoint(websocket: WebSocket):
         welcome_message = {
             "type": "welcome",
             "message": "Connected to ZombieCursor Local AI",
-            "client_id": manager.connection_info[websocket]["client_id"],
-            "timestamp": datetime.now().isoformat()
+            "client_id": manager.active_connections[websocket]["client_id"],
+            "timestamp": now_iso()
         }
-        await manager.send_personal_message(json.dumps(welcome_message), websocket)
+        await manager.send_personal_message(_dumps(welcome_message), websocket)
         
         # Main message loop
         while True:
@@ -118,27 +124,27 @@ async def websocket_endpoint(websocket: WebSocket):
             data = await websocket.receive_text()
             
             try:
-                message = json.loads(data)
+                message = orjson.loads(data)
                 response = await process_message(message, websocket)
                 
                 if response:
-                    await manager.send_personal_message(json.dumps(response), websocket)
+                    await manager.send_personal_message(_dumps(response), websocket)
                     
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 error_response = {
                     "type": "error",
                     "message": "Invalid JSON format",
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": now_iso()
                 }
-                await manager.send_personal_message(json.dumps(error_response), websocket)
+                await manager.send_personal_message(_dumps(error_response), websocket)
                 
             except Exception as e:
                 error_response = {
                     "type": "error",
                     "message": f"Error processing message: {str(e)}",
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": now_iso()
                 }
-                await manager.send_personal_message(json.dumps(error_response), websocket)
+                await manager.send_personal_message(_dumps(error_response), websocket)
                 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
@@ -151,30 +157,22 @@ async def process_message(message: Dict[str, Any], websocket: WebSocket) -> Dict
     """Process incoming WebSocket message."""
     message_type = message.get("type")
     
+    # Unhashable types (e.g. a JSON list) fall through to the unknown-type reply
+    handler = _HANDLERS.get(message_type) if isinstance(message_type, str) else None
+    if handler is not None:
+        return await handler(message, websocket)
+    
     if message_type == "ping":
         return {
             "type": "pong",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
     
-    elif message_type == "agent_request":
-        return await handle_agent_request(message, websocket)
-    
-    elif message_type == "tool_request":
-        return await handle_tool_request(message, websocket)
-    
-    elif message_type == "status_request":
-        return await handle_status_request(message, websocket)
-    
-    elif message_type == "stream_request":
-        return await handle_stream_request(message, websocket)
-    
-    else:
-        return {
-            "type": "error",
-            "message": f"Unknown message type: {message_type}",
-            "timestamp": datetime.now().isoformat()
-        }
+    return {
+        "type": "error",
+        "message": f"Unknown message type: {message_type}",
+        "timestamp": now_iso()
+    }
 
 
 async def handle_agent_request(message: Dict[str, Any], websocket: WebSocket) -> Dict[str, Any]:
@@ -189,21 +187,19 @@ async def handle_agent_request(message: Dict[str, Any], websocket: WebSocket) ->
             return {
                 "type": "error",
                 "message": "Query is required for agent request",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso()
             }
         
-        # Initialize agent
-        if agent_name == "coder":
-            agent = CoderAgent()
-        else:
+        # Look up the shared agent
+        agent = agents.get(agent_name)
+        if agent is None:
             return {
                 "type": "error",
                 "message": f"Unknown agent: {agent_name}",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso()
             }
         
         # Create agent request
-        from core.interfaces import AgentRequest
         agent_request = AgentRequest(
             query=query,
             agent_type=AgentType.CODER,
@@ -223,7 +219,7 @@ async def handle_agent_request(message: Dict[str, Any], websocket: WebSocket) ->
             "metadata": response.metadata,
             "error": response.error,
             "success": response.error is None,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
         
     except Exception as e:
@@ -231,7 +227,7 @@ async def handle_agent_request(message: Dict[str, Any], websocket: WebSocket) ->
         return {
             "type": "error",
             "message": f"Agent request failed: {str(e)}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
 
 
@@ -246,11 +242,11 @@ async def handle_tool_request(message: Dict[str, Any], websocket: WebSocket) ->
             return {
                 "type": "error",
                 "message": "Tool name and operation are required",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso()
             }
         
-        # Initialize agent to access tools
-        agent = CoderAgent()
+        # Access tools through the shared agent
+        agent = agents["coder"]
         
         # Execute tool
         result = await agent.execute_tool(tool_name, operation, **params)
@@ -261,7 +257,7 @@ async def handle_tool_request(message: Dict[str, Any], websocket: WebSocket) ->
             "operation": operation,
             "result": result,
             "success": result.get("success", True) and "error" not in result,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
         
     except Exception as e:
@@ -269,7 +265,7 @@ async def handle_tool_request(message: Dict[str, Any], websocket: WebSocket) ->
         return {
             "type": "error",
             "message": f"Tool request failed: {str(e)}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
 
 
@@ -283,11 +279,11 @@ async def handle_status_request(message: Dict[str, Any], websocket: WebSocket) -
                 "type": "status_response",
                 "status_type": "connections",
                 "connections": manager.get_connection_info(),
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso()
             }
         
         elif status_type == "agent":
-            agent = CoderAgent()
+            agent = agents["coder"]
             health = await agent.health_check()
             capabilities = await agent.get_capabilities()
             
@@ -296,7 +292,7 @@ async def handle_status_request(message: Dict[str, Any], websocket: WebSocket) -
                 "status_type": "agent",
                 "health": health,
                 "capabilities": capabilities,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso()
             }
         
         else:
@@ -306,7 +302,7 @@ async def handle_status_request(message: Dict[str, Any], websocket: WebSocket) -
                 "status_type": "general",
                 "message": "ZombieCursor Local AI is running",
                 "connections": manager.get_connection_info(),
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso()
             }
         
     except Exception as e:
@@ -314,7 +310,7 @@ async def handle_status_request(message: Dict[str, Any], websocket: WebSocket) -
         return {
             "type": "error",
             "message": f"Status request failed: {str(e)}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
 
 
@@ -330,21 +326,19 @@ async def handle_stream_request(message: Dict[str, Any], websocket: WebSocket) -
             return {
                 "type": "error",
                 "message": "Query is required for stream request",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso()
             }
         
-        # Initialize agent
-        if agent_name == "coder":
-            agent = CoderAgent()
-        else:
+        # Look up the shared agent
+        agent = agents.get(agent_name)
+        if agent is None:
             return {
                 "type": "error",
                 "message": f"Unknown agent: {agent_name}",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso()
             }
         
         # Create agent request
-        from core.interfaces import AgentRequest
         agent_request = AgentRequest(
             query=query,
             agent_type=AgentType.CODER,
@@ -358,33 +352,31 @@ async def handle_stream_request(message: Dict[str, Any], websocket: WebSocket) -
             "type": "stream_start",
             "agent": agent_name,
             "query": query,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
-        await manager.send_personal_message(json.dumps(start_message), websocket)
+        await manager.send_personal_message(_dumps(start_message), websocket)
         
-        # Stream response
+        # Stream response, refilling one message dict per chunk
+        chunk_message = {"type": "stream_chunk", "content": None, "timestamp": None}
         async for chunk in agent.run_stream(agent_request):
-            chunk_message = {
-                "type": "stream_chunk",
-                "content": chunk,
-                "timestamp": datetime.now().isoformat()
-            }
-            await manager.send_personal_message(json.dumps(chunk_message), websocket)
+            chunk_message["content"] = chunk
+            chunk_message["timestamp"] = now_iso()
+            await manager.send_personal_message(_dumps(chunk_message), websocket)
         
         # Send end message
         end_message = {
             "type": "stream_end",
             "agent": agent_name,
             "query": query,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
-        await manager.send_personal_message(json.dumps(end_message), websocket)
+        await manager.send_personal_message(_dumps(end_message), websocket)
         
         # Return acknowledgment
         return {
             "type": "stream_acknowledgment",
             "message": "Streaming completed",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
         
     except Exception as e:
@@ -392,17 +384,26 @@ async def handle_stream_request(message: Dict[str, Any], websocket: WebSocket) -
         error_message = {
             "type": "stream_error",
             "message": f"Stream request failed: {str(e)}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
-        await manager.send_personal_message(json.dumps(error_message), websocket)
+        await manager.send_personal_message(_dumps(error_message), websocket)
         
         return {
             "type": "error",
             "message": f"Stream request failed: {str(e)}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
 
 
+# Handlers by message type, for process_message; pings are answered inline
+_HANDLERS: Dict[str, Callable[[Dict[str, Any], WebSocket], Awaitable[Dict[str, Any]]]] = {
+    "agent_request": handle_agent_request,
+    "tool_request": handle_tool_request,
+    "status_request": handle_status_request,
+    "stream_request": handle_stream_request
+}
+
+
 @router.get("/connections")
 async def get_websocket_connections():
     """Get information about WebSocket connections."""
@@ -413,8 +414,8 @@ async def get_websocket_connections():
 async def broadcast_message(message: Dict[str, Any]):
     """Broadcast a message to all connected clients."""
     try:
-        message["timestamp"] = datetime.now().isoformat()
-        await manager.broadcast(json.dumps(message))
+        message["timestamp"] = now_iso()
+        await manager.broadcast(_dumps(message))
         
         return {
             "message": "Message broadcasted successfully",
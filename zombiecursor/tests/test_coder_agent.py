@@ -0,0 +1,91 @@
+"""
+Tests for the Coder Agent's prompt canonicalization and response cache.
+"""
+import asyncio
+import pytest
+from agents.coder import agent as agent_module
+from agents.coder.agent import CoderAgent, _canonicalize
+from core.interfaces import AgentRequest, AgentType
+
+
+class FakeLLM:
+    """LLM stand-in counting chat calls."""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def chat(self, messages):
+        self.calls += 1
+        return f"answer {self.calls}"
+
+
+@pytest.fixture
+def clock_module():
+    return agent_module
+
+
+@pytest.fixture
+def agent():
+    coder = CoderAgent()
+    coder.llm = FakeLLM()
+    return coder
+
+
+def request(query: str, context: str = None) -> AgentRequest:
+    return AgentRequest(query=query, agent_type=AgentType.CODER, context=context)
+
+
+@pytest.mark.request_id("chunk0-4")
+def test_canonicalize_normalizes_whitespace():
+    text = "  \r\nfirst line   \r\n\r\n\r\n\r\nsecond\t\n\n"
+    
+    assert _canonicalize(text) == "first line\n\nsecond"
+
+
+@pytest.mark.request_id("chunk0-4")
+def test_canonicalize_is_idempotent():
+    text = "a  \n\n\n\nb\r\nc"
+    
+    assert _canonicalize(_canonicalize(text)) == _canonicalize(text)
+
+
+@pytest.mark.request_id("chunk0-2")
+def test_repeated_request_is_served_from_cache(agent, clock):
+    first = asyncio.run(agent.run(request("explain decorators")))
+    second = asyncio.run(agent.run(request("explain decorators")))
+    
+    assert agent.llm.calls == 1
+    assert second.content == first.content
+    assert second.metadata["cache"] == "hit"
+
+
+@pytest.mark.request_id("chunk0-2")
+def test_cache_key_includes_context(agent, clock):
+    asyncio.run(agent.run(request("explain this", context="file a")))
+    asyncio.run(agent.run(request("explain this", context="file b")))
+    
+    assert agent.llm.calls == 2
+
+
+@pytest.mark.request_id("chunk0-2")
+def test_cached_response_expires(agent, clock):
+    asyncio.run(agent.run(request("explain decorators")))
+    clock.now += agent_module._CACHE_TTL + 1
+    asyncio.run(agent.run(request("explain decorators")))
+    
+    assert agent.llm.calls == 2
+
+
+@pytest.mark.request_id("chunk0-2")
+def test_cache_evicts_least_recently_used(agent, clock, monkeypatch):
+    monkeypatch.setattr(agent_module, "_CACHE_MAX_ENTRIES", 2)
+    agent._set_cached_response("a", "A")
+    agent._set_cached_response("b", "B")
+    
+    # Reading "a" makes "b" the least recently used entry
+    assert agent._get_cached_response("a") == "A"
+    agent._set_cached_response("c", "C")
+    
+    assert agent._get_cached_response("b") is None
+    assert agent._get_cached_response("a") == "A"
+    assert agent._get_cached_response("c") == "C"
@@ -0,0 +1,32 @@
+"""
+Tests for the project context loader.
+"""
+import pytest
+from core.context import ProjectContext
+
+
+@pytest.mark.request_id("chunk1-8")
+def test_collect_sees_files_added_deep_in_the_tree(tmp_path):
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "src" / "pkg" / "a.py").write_text("a = 1\n")
+    context = ProjectContext(str(tmp_path))
+    
+    assert "b.py" not in context.collect()
+    assert context._is_cache_valid()
+    
+    (tmp_path / "src" / "pkg" / "b.py").write_text("b = 2\n")
+    assert not context._is_cache_valid()
+    assert "b.py" in context.collect()
+
+
+@pytest.mark.request_id("chunk1-8")
+def test_collect_sees_removed_directories(tmp_path):
+    (tmp_path / "src" / "pkg" / "sub").mkdir(parents=True)
+    (tmp_path / "src" / "pkg" / "sub" / "c.py").write_text("c = 3\n")
+    context = ProjectContext(str(tmp_path))
+    
+    assert "Total Files: 1" in context.collect()
+    
+    (tmp_path / "src" / "pkg" / "sub" / "c.py").unlink()
+    (tmp_path / "src" / "pkg" / "sub").rmdir()
+    assert "Total Files: 0" in context.collect()
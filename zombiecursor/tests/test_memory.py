@@ -0,0 +1,129 @@
+"""
+Tests for the SQLite memory store.
+"""
+import os
+import sys
+import asyncio
+import subprocess
+import orjson
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+from core import memory
+from core.memory import SimpleMemoryStore
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    # Settings are frozen, so swap in the one value the store reads
+    monkeypatch.setattr(memory, "settings", SimpleNamespace(vector_store_path=str(tmp_path)))
+    return tmp_path
+
+
+@pytest.fixture
+def store(store_dir):
+    store = SimpleMemoryStore()
+    yield store
+    store.close()
+
+
+@pytest.mark.request_id("chunk2-3")
+def test_store_survives_process_exit(store_dir):
+    # The write happens under a running loop, so it is only committed by the
+    # deferred flush or on exit; the process never flushes explicitly
+    script = (
+        "import asyncio\n"
+        "from core.memory import memory_store\n"
+        "asyncio.run(memory_store.store('greeting', {'query': 'hi', 'response': 'hello'}))\n"
+    )
+    env = dict(os.environ, VECTOR_STORE_PATH=str(store_dir), PYTHONPATH=str(ROOT))
+    subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, check=True, timeout=60)
+    
+    reloaded = SimpleMemoryStore()
+    try:
+        assert asyncio.run(reloaded.retrieve("greeting")) == {"query": "hi", "response": "hello"}
+    finally:
+        reloaded.close()
+
+
+@pytest.mark.request_id("chunk2-1")
+def test_store_and_retrieve(store):
+    asyncio.run(store.store("key", {"query": "q", "response": "r"}))
+    
+    assert asyncio.run(store.retrieve("key")) == {"query": "q", "response": "r"}
+    assert asyncio.run(store.retrieve("missing")) is None
+
+
+@pytest.mark.request_id("chunk2-1")
+def test_migrates_legacy_json(store_dir):
+    legacy = {
+        "old": {
+            "value": {"query": "legacy question", "response": "legacy answer"},
+            "timestamp": "2024-01-01T10:00:00",
+            "accessed": "2024-01-02T10:00:00"
+        }
+    }
+    (store_dir / "memory.json").write_bytes(orjson.dumps(legacy))
+    
+    migrated = SimpleMemoryStore()
+    try:
+        assert asyncio.run(migrated.retrieve("old")) == legacy["old"]["value"]
+        stats = asyncio.run(migrated.get_stats())
+        assert stats["total_entries"] == 1
+        assert [r["key"] for r in asyncio.run(migrated.search("legacy"))] == ["old"]
+    finally:
+        migrated.close()
+
+
+@pytest.mark.request_id("chunk2-2")
+def test_search_matches_all_tokens_in_values(store):
+    asyncio.run(store.store("json", {"query": "how to parse json", "response": "use orjson"}))
+    asyncio.run(store.store("yaml", {"query": "parse yaml", "response": "yaml.safe_load"}))
+    asyncio.run(store.store("class", {"query": "write a python class", "response": "class X: pass"}))
+    
+    assert {r["key"] for r in asyncio.run(store.search("parse"))} == {"json", "yaml"}
+    assert [r["key"] for r in asyncio.run(store.search("json parse"))] == ["json"]
+    assert asyncio.run(store.search("")) == []
+
+
+@pytest.mark.request_id("chunk2-2")
+def test_search_ignores_key_names(store):
+    asyncio.run(store.store("entry", {"query": "something", "response": "else"}))
+    
+    assert asyncio.run(store.search("query")) == []
+    assert asyncio.run(store.search("response")) == []
+
+
+@pytest.mark.request_id("chunk2-2")
+def test_search_follows_updates(store):
+    asyncio.run(store.store("entry", {"query": "before", "response": "x"}))
+    asyncio.run(store.store("entry", {"query": "after", "response": "x"}))
+    
+    assert asyncio.run(store.search("before")) == []
+    assert [r["key"] for r in asyncio.run(store.search("after"))] == ["entry"]
+
+
+@pytest.mark.request_id("chunk2-2")
+def test_search_does_not_interpret_fts_syntax(store):
+    asyncio.run(store.store("entry", {"query": "weird OR input", "response": "x"}))
+    
+    assert [r["key"] for r in asyncio.run(store.search('"weird OR'))] == ["entry"]
+
+
+@pytest.mark.request_id("chunk2-20")
+def test_stats_and_cleanup(store):
+    asyncio.run(store.store("a", {"query": "first"}))
+    asyncio.run(store.store("b", {"query": "second"}))
+    asyncio.run(store.store("a", {"query": "first again"}))
+    
+    stats = asyncio.run(store.get_stats())
+    assert stats["total_entries"] == 2
+    assert stats["oldest_entry_days"] == 0
+    
+    asyncio.run(store.cleanup(days=0))
+    stats = asyncio.run(store.get_stats())
+    assert stats["total_entries"] == 0
+    assert asyncio.run(store.search("first")) == []
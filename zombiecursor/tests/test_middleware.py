@@ -0,0 +1,194 @@
+"""
+Tests for the security middleware.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from server import middleware
+from server.middleware import (
+    RateLimiter, IPAllowlist, ZombieSecurityMiddleware,
+    get_client_ip, get_api_key, hash_api_key, rate_limit_key
+)
+
+
+@pytest.fixture
+def clock_module():
+    return middleware
+
+
+def make_client(**options) -> TestClient:
+    app = FastAPI()
+    
+    @app.get("/items")
+    async def items():
+        return {"ok": True}
+    
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+    
+    app.add_middleware(ZombieSecurityMiddleware, **options)
+    return TestClient(app)
+
+
+@pytest.mark.request_id("chunk3-1")
+def test_rate_limiter_allows_a_burst_then_limits(clock):
+    limiter = RateLimiter(calls=3, period=60)
+    
+    assert [limiter.is_rate_limited("client") for _ in range(4)] == [False, False, False, True]
+    assert limiter.is_rate_limited("other") is False
+
+
+@pytest.mark.request_id("chunk3-1")
+def test_rate_limiter_refills_over_time(clock):
+    limiter = RateLimiter(calls=2, period=60)
+    limiter.is_rate_limited("client")
+    limiter.is_rate_limited("client")
+    assert limiter.is_rate_limited("client") is True
+    
+    # One token comes back every period / calls seconds
+    clock.now += 30
+    assert limiter.is_rate_limited("client") is False
+    assert limiter.is_rate_limited("client") is True
+    
+    # Never more than a full bucket, however long the client was idle
+    clock.now += 3600
+    assert [limiter.is_rate_limited("client") for _ in range(3)] == [False, False, True]
+
+
+@pytest.mark.request_id("chunk3-1")
+def test_rate_limiter_sweeps_idle_buckets(clock, monkeypatch):
+    monkeypatch.setattr(middleware, "_RATE_LIMIT_SWEEP_THRESHOLD", 4)
+    limiter = RateLimiter(calls=1, period=60)
+    keys = [f"client-{i}" for i in range(200)]
+    for key in keys:
+        limiter.is_rate_limited(key)
+    
+    clock.now += 120
+    for key in keys:
+        limiter.is_rate_limited(f"new-{key}")
+    
+    assert sum(len(shard) for shard in limiter._shards) < 2 * len(keys)
+
+
+@pytest.mark.request_id("chunk3-3")
+def test_ip_allowlist_matches_addresses_and_networks():
+    allowlist = IPAllowlist(["10.0.0.0/8", "192.168.1.5", "10.1.0.0/16", "2001:db8::/32", "not-an-ip"])
+    
+    assert allowlist
+    assert allowlist.is_allowed("10.200.3.4")
+    assert allowlist.is_allowed("192.168.1.5")
+    assert not allowlist.is_allowed("192.168.1.6")
+    assert not allowlist.is_allowed("11.0.0.1")
+    assert allowlist.is_allowed("2001:db8::1")
+    assert not allowlist.is_allowed("2001:db9::1")
+    assert not allowlist.is_allowed("garbage")
+
+
+@pytest.mark.request_id("chunk3-3")
+def test_empty_ip_allowlist_is_falsy():
+    assert not IPAllowlist([])
+    assert not IPAllowlist(["not-an-ip"])
+
+
+@pytest.mark.request_id("chunk3-4")
+def test_client_ip_prefers_forwarded_headers():
+    scope = {
+        "headers": [(b"x-real-ip", b"2.2.2.2"), (b"x-forwarded-for", b"1.1.1.1, 3.3.3.3")],
+        "client": ("4.4.4.4", 1234)
+    }
+    assert get_client_ip(scope) == "1.1.1.1"
+    assert get_client_ip({"headers": [(b"x-real-ip", b"2.2.2.2")], "client": ("4.4.4.4", 1)}) == "2.2.2.2"
+    assert get_client_ip({"headers": [], "client": ("4.4.4.4", 1)}) == "4.4.4.4"
+
+
+@pytest.mark.request_id("chunk3-15")
+def test_api_key_from_header_or_query():
+    assert get_api_key({"headers": [(b"x-api-key", b"secret")], "query_string": b""}) == "secret"
+    assert get_api_key({"headers": [], "query_string": b"a=1&api_key=from%20query"}) == "from query"
+    assert get_api_key({"headers": [], "query_string": b""}) is None
+
+
+@pytest.mark.request_id("chunk3-21")
+def test_rate_limit_key_prefers_authenticated_key():
+    scope = {"headers": [], "client": ("4.4.4.4", 1), "state": {"api_key_hash": hash_api_key("k")}}
+    assert rate_limit_key(scope) == hash_api_key("k")
+    assert rate_limit_key({"headers": [], "client": ("4.4.4.4", 1)}) == "4.4.4.4"
+
+
+@pytest.mark.request_id("chunk3-5")
+def test_security_headers_and_process_time():
+    response = make_client().get("/items")
+    
+    assert response.status_code == 200
+    assert response.headers["x-frame-options"] == "DENY"
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert "content-security-policy" in response.headers
+    assert float(response.headers["x-process-time"]) >= 0
+
+
+@pytest.mark.request_id("chunk3-15")
+def test_api_key_required_outside_skip_paths():
+    client = make_client(api_keys=["good"])
+    
+    assert client.get("/items").status_code == 401
+    assert client.get("/items", headers={"X-API-Key": "bad"}).status_code == 401
+    assert client.get("/items", headers={"X-API-Key": "good"}).status_code == 200
+    assert client.get("/items?api_key=good").status_code == 200
+    assert client.get("/health").status_code == 200
+
+
+@pytest.mark.request_id("chunk3-5")
+def test_rejections_carry_security_headers():
+    response = make_client(api_keys=["good"]).get("/items")
+    
+    assert response.json() == {"detail": "Invalid or missing API key"}
+    assert response.headers["x-frame-options"] == "DENY"
+
+
+@pytest.mark.request_id("chunk3-5")
+def test_ip_allowlist_rejects_other_clients():
+    client = make_client(allowed_ips=["10.0.0.0/8"])
+    
+    assert client.get("/items", headers={"X-Forwarded-For": "10.1.2.3"}).status_code == 200
+    assert client.get("/items", headers={"X-Forwarded-For": "8.8.8.8"}).status_code == 403
+
+
+@pytest.mark.request_id("chunk3-21")
+def test_rate_limit_buckets_per_api_key(clock):
+    client = make_client(rate_limit_calls=2, api_keys=["one", "two"])
+    
+    statuses = [client.get("/items", headers={"X-API-Key": "one"}).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    assert client.get("/items", headers={"X-API-Key": "two"}).status_code == 200
+
+
+class RecordUserKey:
+    """Outer authentication layer recording a verified key digest in scope state."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"x-user":
+                    scope.setdefault("state", {})["api_key_hash"] = hash_api_key(value.decode())
+        await self.app(scope, receive, send)
+
+
+@pytest.mark.request_id("chunk3-21")
+def test_rate_limit_uses_key_set_by_outer_layer(clock):
+    app = FastAPI()
+    
+    @app.get("/items")
+    async def items():
+        return {"ok": True}
+    
+    app.add_middleware(ZombieSecurityMiddleware, rate_limit_calls=1)
+    app.add_middleware(RecordUserKey)
+    client = TestClient(app)
+    
+    assert client.get("/items", headers={"X-User": "a"}).status_code == 200
+    assert client.get("/items", headers={"X-User": "a"}).status_code == 429
+    assert client.get("/items", headers={"X-User": "b"}).status_code == 200
@@ -0,0 +1,72 @@
+"""
+Tests for the Coder Agent's prompt templates.
+"""
+import os
+import pytest
+from agents.coder.prompts import PromptManager
+
+
+@pytest.fixture
+def prompts(tmp_path):
+    # Keep templates out of the package directory
+    manager = PromptManager.__new__(PromptManager)
+    manager.prompts_dir = tmp_path
+    manager._template_cache = {}
+    manager._init_default_prompts()
+    return manager
+
+
+@pytest.mark.request_id("chunk0-18")
+def test_defaults_are_written_once(prompts):
+    assert sorted(prompts.list_prompts()) == sorted(PromptManager._DEFAULT_PROMPTS)
+    
+    prompts.save_prompt("code_review", "custom {code}")
+    prompts._init_default_prompts()
+    
+    assert prompts.get_prompt("code_review") == "custom {code}"
+
+
+@pytest.mark.request_id("chunk0-18")
+def test_save_replaces_atomically(prompts):
+    prompts.save_prompt("custom", "first {request}")
+    prompts.save_prompt("custom", "second {request}")
+    
+    assert prompts.get_prompt("custom") == "second {request}"
+    assert not any(name.endswith(".tmp") for name in os.listdir(prompts.prompts_dir))
+
+
+@pytest.mark.request_id("chunk0-17")
+def test_template_cache_follows_file_changes(prompts):
+    prompts.save_prompt("custom", "first {request}")
+    assert prompts.get_prompt("custom") == "first {request}"
+    
+    # Edited outside the manager, with a different mtime
+    prompt_file = prompts.prompts_dir / "custom.txt"
+    prompt_file.write_text("edited {request}", encoding="utf-8")
+    stat = prompt_file.stat()
+    os.utime(prompt_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    
+    assert prompts.get_prompt("custom") == "edited {request}"
+
+
+@pytest.mark.request_id("chunk0-20")
+def test_deleted_prompt_falls_back_to_default(prompts):
+    assert prompts.delete_prompt("code_review") is True
+    assert prompts.delete_prompt("code_review") is False
+    
+    assert prompts.get_prompt("code_review") == "Review this code: {code}"
+
+
+@pytest.mark.request_id("chunk0-19")
+def test_format_prompt_marks_missing_variables(prompts):
+    prompts.save_prompt("custom", "Fix {error} in {code!r:>6}")
+    
+    assert prompts.format_prompt("custom", code="x") == "Fix [Missing variable: error] in    'x'"
+
+
+@pytest.mark.request_id("chunk0-19")
+def test_format_prompt_expands_nested_specs(prompts):
+    prompts.save_prompt("custom", "[{x:>{w}}] [{x:{fill}^{w}}]")
+    
+    assert prompts.format_prompt("custom", x="a", w=5, fill="*") == "[    a] [**a**]"
+    assert prompts.format_prompt("custom", x="a", w=5) == "[    a] [[Missing variable: fill]]"
@@ -0,0 +1,20 @@
+"""
+Tests for WebSocket message dispatch.
+"""
+import asyncio
+import pytest
+from server.ws import process_message
+
+
+@pytest.mark.request_id("chunk4-12")
+def test_ping_gets_pong():
+    assert asyncio.run(process_message({"type": "ping"}, None))["type"] == "pong"
+
+
+@pytest.mark.request_id("chunk4-12")
+def test_unknown_and_unhashable_types_are_reported():
+    for message_type in ["nope", ["list"], {"a": 1}, None]:
+        reply = asyncio.run(process_message({"type": message_type}, None))
+        
+        assert reply["type"] == "error"
+        assert reply["message"] == f"Unknown message type: {message_type}"
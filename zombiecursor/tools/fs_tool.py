@@ -10,7 +10,7 @@ from core.config import settings
 from core.logging_config import log
 from core.utils import (
     safe_read_file, get_file_info, sanitize_filename, 
-    is_text_file, is_git_ignored, parse_gitignore
+    is_text_file, is_git_ignored, parse_gitignore, iter_file_entries
 )
 
 
@@ -146,14 +146,15 @@ class FilesystemTool(Tool):
             
             if recursive:
                 pattern_path = f"**/{pattern}"
-                file_paths = dir_path.glob(pattern_path)
             else:
-                file_paths = dir_path.glob(pattern)
-            
-            for file_path in file_paths:
-                if file_path.is_file() and self._is_allowed_path(file_path):
-                    if not is_git_ignored(file_path, self.base_path):
-                        info = get_file_info(file_path)
+                pattern_path = pattern
+            
+            # Entries come from scandir, their cached stat is reused for the file info
+            for entry in iter_file_entries(dir_path, pattern_path):
+                file_path = Path(entry.path)
+                if self._is_allowed_path(file_path):
+                    if not is_git_ignored(file_path, self.base_path, is_dir=False):
+                        info = get_file_info(file_path, entry.stat())
                         files.append(info)
             
             # Sort by name
@@ -299,7 +300,7 @@ class FilesystemTool(Tool):
                 if (file_path.is_file() and 
                     self._is_allowed_path(file_path) and 
                     is_text_file(file_path) and
-                    not is_git_ignored(file_path, self.base_path)):
+                    not is_git_ignored(file_path, self.base_path, is_dir=False)):
                     
                     content = safe_read_file(file_path, max_size=1024*1024)  # 1MB limit
                     if content:
@@ -121,7 +121,7 @@ class SearchTool(Tool):
                 
                 for file_path in files:
                     if (is_text_file(file_path) and 
-                        not is_git_ignored(file_path, self.base_path)):
+                        not is_git_ignored(file_path, self.base_path, is_dir=False)):
                         
                         files_searched += 1
                         content = safe_read_file(file_path, max_size=1024*1024)  # 1MB limit
@@ -186,7 +186,7 @@ class SearchTool(Tool):
             result_files = []
             for file_path in files[:max_results]:
                 if (is_text_file(file_path) and 
-                    not is_git_ignored(file_path, self.base_path)):
+                    not is_git_ignored(file_path, self.base_path, is_dir=False)):
                     
                     result_files.append({
                         'path': str(file_path.relative_to(self.base_path)),
@@ -235,7 +235,7 @@ class SearchTool(Tool):
                 for file_path in files:
                     if (file_path.suffix == '.py' and 
                         is_text_file(file_path) and
-                        not is_git_ignored(file_path, self.base_path)):
+                        not is_git_ignored(file_path, self.base_path, is_dir=False)):
                         
                         content = safe_read_file(file_path)
                         if content:
@@ -301,7 +301,7 @@ class SearchTool(Tool):
                 for file_path in files:
                     if (file_path.suffix == '.py' and 
                         is_text_file(file_path) and
-                        not is_git_ignored(file_path, self.base_path)):
+                        not is_git_ignored(file_path, self.base_path, is_dir=False)):
                         
                         content = safe_read_file(file_path)
                         if content:
@@ -356,7 +356,7 @@ class SearchTool(Tool):
                 for file_path in files:
                     if (file_path.suffix == '.py' and 
                         is_text_file(file_path) and
-                        not is_git_ignored(file_path, self.base_path)):
+                        not is_git_ignored(file_path, self.base_path, is_dir=False)):
                         
                         content = safe_read_file(file_path)
                         if content:
@@ -409,7 +409,7 @@ class SearchTool(Tool):
                 
                 for file_path in files:
                     if (is_text_file(file_path) and 
-                        not is_git_ignored(file_path, self.base_path)):
+                        not is_git_ignored(file_path, self.base_path, is_dir=False)):
                         
                         content = safe_read_file(file_path)
                         if content:
@@ -461,7 +461,7 @@ class SearchTool(Tool):
                 for file_path in files:
                     if (file_path.suffix == '.py' and 
                         is_text_file(file_path) and
-                        not is_git_ignored(file_path, self.base_path)):
+                        not is_git_ignored(file_path, self.base_path, is_dir=False)):
                         
                         content = safe_read_file(file_path)
                         if content: